@@ -1,7 +1,25 @@
 import bpy
-import json
+from mathutils import Quaternion
 import math
-from decimal import Decimal, ROUND_HALF_UP
+from array import array
+import itertools
+import hashlib
+import os
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+# The conversion itself lives in minecraft_animatic_core.py next to this script so it can also run without Blender
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from minecraft_animatic_core import (
+    new_samples, animation_header, convert_bone, open_atomic,
+    bone_cache_options, load_bone_cache, save_bone_cache, PhaseProfile, profile_phase,
+    bake_key_frames, animation_file_steps, DEFAULT_KEYFRAME_TOLERANCES, DEFAULT_PRECISIONS,
+)
 
 # Define supported format versions
 FORMAT_VERSIONS = [
@@ -11,239 +29,546 @@ FORMAT_VERSIONS = [
     "1.19.70", "1.19.80", "1.20.0", "1.20.10", "1.20.20", "1.20.30", "1.20.40",
 ]
 
-# Define the position and scale multipliers
-OBJ_POSITION_MULTIPLIER = 15.5
-POSITION_MULTIPLIER = 16.0
-SCALE_MULTIPLIER = 1.0
-ROTATION_MULTIPLIER = 1.0
+# Transform channels read from pose bones and objects
+TRANSFORM_CHANNELS = ('location', 'rotation_quaternion', 'rotation_euler', 'scale')
+POSE_BONE_PATH = re.compile(r'^pose\.bones\["((?:[^"\\]|\\.)*)"\]\.(\w+)$')
+
+# Modal exports run steps for up to this many seconds per timer tick, leaving the rest of the time to redraw the UI
+MODAL_TIMER_INTERVAL = 0.01
+MODAL_STEP_BUDGET = 1 / 30
+
+# Events still handled by Blender during a modal export, so the view can be navigated
+MODAL_PASS_THROUGH_EVENTS = {'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MOUSEMOVE', 'TRACKPADPAN', 'TRACKPADZOOM'}
 
 def quaternion_to_xyz(rotation_quaternion):
     euler = rotation_quaternion.to_euler()
     return euler.x, euler.y, euler.z
 
-# Inside the export_minecraft_animation function, modify the rotation and position data accordingly
-def export_minecraft_animation(context, filepath, anim_id, loop, override, anim_time_update, blend_weight, start_delay, loop_delay, format_version, invert_rotation_axes, invert_position_axes, export_armature):
-    # Ensure the file has a .json extension
-    if not filepath.lower().endswith('.json'):
-        filepath += '.json'
-
-    # Map loop options
-    loop_mapping = {"Play Once": False, "Loop": True, "Hold On Last Frame": "hold_on_last_frame"}
-
-    # Convert animation length from frames to seconds
-    anim_length_seconds = (context.scene.frame_end - context.scene.frame_start) / context.scene.render.fps
-
-    # Initialize the data structure
-    export_data = {
-        "format_version": format_version,
-        "animations": {
-            anim_id: {
-                "loop": loop_mapping[loop],
-                "animation_length": round(anim_length_seconds, 5),
-                "override_previous_animation": override,
-                **{key: value for key, value in {
-                    "anim_time_update": anim_time_update if anim_time_update != "0.0" else None,
-                    "blend_weight": blend_weight if blend_weight != "0.0" else None,
-                    "start_delay": start_delay if start_delay != "0.0" else None,
-                    "loop_delay": loop_delay if loop_delay != "0.0" else None
-                }.items() if value},
-                "bones": {}
-            }
-        }
+def keyframe_frames(fcurve):
+    # Read all keyframe coordinates in one call instead of iterating keyframe_points
+    co = [0.0] * (len(fcurve.keyframe_points) * 2)
+    fcurve.keyframe_points.foreach_get('co', co)
+    return {int(x) for x in co[::2]}
+
+def build_fcurve_index(action):
+    # Map each bone name, or None for the object itself, to its transform F-curves per channel
+    index = {}
+
+    for fc in action.fcurves:
+        match = POSE_BONE_PATH.match(fc.data_path)
+        if match:
+            bone_name = re.sub(r'\\(.)', r'\1', match.group(1))
+            channel = match.group(2)
+        else:
+            bone_name = None
+            channel = fc.data_path
+
+        if channel in TRANSFORM_CHANNELS:
+            index.setdefault(bone_name, {}).setdefault(channel, []).append((fc.array_index, fc))
+
+    return index
+
+def hash_fcurve(digest, fc):
+    # Hash everything that shapes the curve between its keyframes
+    count = len(fc.keyframe_points)
+    digest.update(repr((fc.data_path, fc.array_index, fc.extrapolation, count)).encode())
+
+    for attribute in ('co', 'handle_left', 'handle_right'):
+        values = array('f', bytes(4 * 2 * count))
+        fc.keyframe_points.foreach_get(attribute, values)
+        digest.update(values)
+
+    for attribute in ('interpolation', 'easing'):
+        values = array('i', bytes(4 * count))
+        fc.keyframe_points.foreach_get(attribute, values)
+        digest.update(values)
+
+def bone_cache_key(name, tracks, options):
+    # A bone only needs converting again when its F-curves, keyed frames or the export options change
+    # Baked bones depend on the whole rig rather than their own F-curves, so they are never cached
+    if any(track["baked"] for track in tracks):
+        return None
+
+    digest = hashlib.sha1(options.encode())
+    digest.update(name.encode())
+
+    for track in tracks:
+        target = track["pose_bone"] if track["bone"] is not None else track["object"]
+        digest.update(repr((track["object"].name, track["bone"] is not None, target.rotation_mode, sorted(track["frames"]))).encode())
+
+        keyed = set()
+        for channel, fcurves in sorted(track["fcurves"].items()):
+            for array_index, fc in sorted(fcurves, key=lambda item: item[0]):
+                keyed.add((channel, array_index))
+                hash_fcurve(digest, fc)
+
+        # Channels without F-curves keep their current value on every frame
+        for channel in TRANSFORM_CHANNELS:
+            for array_index, value in enumerate(getattr(target, channel)):
+                if (channel, array_index) not in keyed:
+                    digest.update(repr(value).encode())
+
+    return digest.hexdigest()
+
+def evaluate_fcurve_channels(target, channel_fcurves, frame):
+    # Start from the current values so channels without F-curves match a scene evaluation
+    channels = {
+        "location": list(target.location),
+        "rotation_euler": list(target.rotation_euler),
+        "rotation_quaternion": list(target.rotation_quaternion),
+        "scale": list(target.scale),
     }
 
-    # Initialize variables outside the loop
-    transformed_position = None
-    transformed_scale = None
-
-    # Iterate through selected objects
-    for obj in bpy.context.selected_objects:
-        if obj.type == 'ARMATURE' and export_armature:
-            armature = obj.data
-
-            for bone in armature.bones:
-                # Check if bone has animation data
-                if obj.animation_data and obj.animation_data.action:
-                    bone_data = {
-                        "rotation": {},
-                        "position": {},
-                        "scale": {}
-                    }
-
-                    # Iterate through keyframes in the animation
-                    keyframes = set()
-
-                    for fc in obj.animation_data.action.fcurves:
-                        if fc.data_path in [f'pose.bones["{bone.name}"].location',
-                                            f'pose.bones["{bone.name}"].rotation_quaternion',
-                                            f'pose.bones["{bone.name}"].rotation_euler',
-                                            f'pose.bones["{bone.name}"].scale']:
-                            keyframes.update(int(k.co.x) for k in fc.keyframe_points)
-
-                    # If there are no keyframes for the current bone, skip processing
-                    if not keyframes:
-                        print(f"Skipping bone {bone.name} in armature {obj.name} as it has no animation data.")
-                        continue
-
-                    # Sort keyframes in ascending order
-                    sorted_keyframes = sorted(keyframes)
-
-                    for frame in sorted_keyframes:
-                        bpy.context.scene.frame_set(frame)
+    for channel, fcurves in channel_fcurves.items():
+        for array_index, fc in fcurves:
+            channels[channel][array_index] = fc.evaluate(frame)
 
-                        # Rotation data
-                        if bpy.data.objects[obj.name].pose.bones[bone.name].rotation_mode == 'XYZ':
-                            rotation_data_euler = bpy.data.objects[obj.name].pose.bones[bone.name].rotation_euler
-                        else:
-                            rotation_quaternion = bpy.data.objects[obj.name].pose.bones[bone.name].rotation_quaternion
-                            rotation_data_euler = rotation_quaternion.to_euler()
-
-                        # Convert to degrees and invert specific axes if needed, rounding to one decimal place
-                        rotation_data = [
-                            float(Decimal(math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)) if axis not in invert_rotation_axes 
-                            else float(Decimal(-math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
-                            for axis, angle in enumerate(rotation_data_euler)
-                        ]
+    return SimpleNamespace(
+        rotation_mode=target.rotation_mode,
+        rotation_euler=channels["rotation_euler"],
+        rotation_quaternion=Quaternion(channels["rotation_quaternion"]),
+        location=channels["location"],
+        scale=channels["scale"],
+    )
 
-                        if not hasattr(bpy.data.objects[obj.name].pose.bones[bone.name], 'rotation_quaternion'):
-                            # Swap Y and Z values for XYZ rotation
-                            rotation_data = [rotation_data[0], rotation_data[2], rotation_data[1]]
+def sample_pose_bone(samples, pose_bone, frame):
+    # Rotation data
+    if pose_bone.rotation_mode == 'XYZ':
+        rotation_data_euler = pose_bone.rotation_euler
+    else:
+        rotation_quaternion = pose_bone.rotation_quaternion
+        rotation_data_euler = rotation_quaternion.to_euler()
+
+    samples["frames"].append(frame)
+    samples["rotation"].append(tuple(rotation_data_euler))
+    samples["location"].append(tuple(pose_bone.location))
+    samples["scale"].append(tuple(pose_bone.scale))
+
+def sample_object(samples, obj, frame):
+    # Check if the rotation mode is XYZ
+    if obj.rotation_mode == 'XYZ':
+        rotation_data = tuple(obj.rotation_euler)
+    else:
+        rotation_data = quaternion_to_xyz(obj.rotation_quaternion)
+
+    samples["frames"].append(frame)
+    samples["euler_mode"].append(obj.rotation_mode == 'XYZ')
+    samples["rotation"].append(rotation_data)
+    samples["location"].append(tuple(obj.location))
+    samples["scale"].append(tuple(obj.scale))
+
+def object_rig_name(obj):
+    # Objects are grouped under their top-most parent, which is the rig for glTF empties
+    while obj.parent is not None:
+        obj = obj.parent
+    return obj.name
+
+def object_clips(obj, batch_mode, export_armature, fcurve_indexes):
+    # Yield (clip name, action, frame range) for each clip the object takes part in
+    animation_data = obj.animation_data
+
+    if batch_mode == 'NLA':
+        if animation_data:
+            for nla_track in animation_data.nla_tracks:
+                for strip in nla_track.strips:
+                    if strip.action:
+                        yield strip.name, strip.action, (strip.action_frame_start, strip.action_frame_end)
+
+    elif obj.type == 'ARMATURE' and export_armature:
+        # Every action driving at least one of the armature's bones
+        bone_names = {bone.name for bone in obj.data.bones}
+        for action in bpy.data.actions:
+            if action not in fcurve_indexes:
+                fcurve_indexes[action] = build_fcurve_index(action)
+            if bone_names.intersection(name for name in fcurve_indexes[action] if name is not None):
+                yield action.name, action, tuple(action.frame_range)
+
+    elif animation_data:
+        # The active action and every action placed on the object's NLA tracks
+        actions = [animation_data.action] if animation_data.action else []
+        for nla_track in animation_data.nla_tracks:
+            for strip in nla_track.strips:
+                if strip.action and strip.action not in actions:
+                    actions.append(strip.action)
+
+        for action in actions:
+            yield action.name, action, tuple(action.frame_range)
+
+def collect_clips(context, batch_mode, anim_id, anim_id_template, export_armature, fcurve_indexes):
+    # The active action of every selected object is exported as one animation over the scene range
+    if batch_mode == 'ACTIVE':
+        return [{
+            "anim_id": anim_id,
+            "frame_start": context.scene.frame_start,
+            "frame_end": context.scene.frame_end,
+            "key_range": None,
+            "actions": [(obj, obj.animation_data.action if obj.animation_data else None) for obj in bpy.context.selected_objects],
+        }]
+
+    # Otherwise every clip of every selected object, grouped per rig and clip name
+    clips = {}
+    for obj in bpy.context.selected_objects:
+        rig = obj.name if obj.type == 'ARMATURE' and export_armature else object_rig_name(obj)
 
-                        # Invert X Y & Z and Rotation data
-                        rotation_data[0] = -rotation_data[0]
-                        rotation_data[1] = -rotation_data[1]
-                        rotation_data[2] = -rotation_data[2]
-                        
-                        # If invert options are true in export menu
-                        if invert_rotation_axes[2]:
-                            rotation_data[2] = -rotation_data[2]
+        for clip_name, action, frame_range in object_clips(obj, batch_mode, export_armature, fcurve_indexes):
+            frame_start, frame_end = int(round(frame_range[0])), int(round(frame_range[1]))
 
-                        # Multiply rotation values by the rotation multiplier
-                        rotation_data = [angle * ROTATION_MULTIPLIER for angle in rotation_data]
+            clip = clips.get((rig, clip_name))
+            if clip is None:
+                clip = clips[(rig, clip_name)] = {
+                    "anim_id": anim_id_template.replace("{rig}", rig).replace("{action}", clip_name),
+                    "frame_start": frame_start,
+                    "frame_end": frame_end,
+                    "key_range": True,
+                    "actions": [],
+                }
 
-                        # Add the modified rotation data to bone_data
-                        bone_data["rotation"][round(frame / bpy.context.scene.render.fps, 5)] = rotation_data
+            clip["frame_start"] = min(clip["frame_start"], frame_start)
+            clip["frame_end"] = max(clip["frame_end"], frame_end)
+            clip["actions"].append((obj, action))
 
-                        # Original position data
-                        original_position = bpy.data.objects[obj.name].pose.bones[bone.name].location
+    for clip in clips.values():
+        clip["key_range"] = (clip["frame_start"], clip["frame_end"])
 
-                        # Multiply position values by the multiplier
-                        transformed_position = [coord * POSITION_MULTIPLIER for coord in original_position]
+    if not clips:
+        print("Skipping export as no selected object has any actions.")
 
-                        # Invert Y and Z components of position_data
-                        transformed_position[2] = -transformed_position[2]
-                        
-                        # If invert options are true in export menu
-                        if invert_position_axes[0]:
-                            transformed_position[0] = -transformed_position[0]
-                        if invert_position_axes[1]:
-                            transformed_position[1] = -transformed_position[1]
-                        if invert_position_axes[2]:
-                            transformed_position[2] = -transformed_position[2]
+    return list(clips.values())
 
-                        # Add the modified position data to bone_data["position"]
-                        bone_data["position"][round(frame / bpy.context.scene.render.fps, 5)] = transformed_position
+def collect_tracks(clip, export_armature, fcurve_indexes, rig_bones, bake_pose=False):
+    # Collect every animated pose bone and object along with the frames it is keyed on,
+    # grouped by the bone name they are written under. Baked bones are sampled separately.
+    bone_tracks = {}
+    frame_tracks = {}
 
-                        # Scale data
-                        scale_data = bpy.data.objects[obj.name].pose.bones[bone.name].scale
+    def keyed_frames(frames):
+        if clip["key_range"] is None:
+            return frames
+        return {frame for frame in frames if clip["key_range"][0] <= frame <= clip["key_range"][1]}
 
-                        # Multiply scale values by the scale multiplier
-                        transformed_scale = [coord * SCALE_MULTIPLIER for coord in scale_data]
+    # Iterate through selected objects
+    for obj, action in clip["actions"]:
+        if obj.type == 'ARMATURE' and export_armature:
+            # Index the action's F-curves once, shared by every armature and clip using it
+            fcurve_index = None
+            if action:
+                if action not in fcurve_indexes:
+                    fcurve_indexes[action] = build_fcurve_index(action)
+                fcurve_index = fcurve_indexes[action]
+
+            # Resolve the armature's pose bones once, shared by every clip
+            if obj not in rig_bones:
+                rig_bones[obj] = [(bone, obj.pose.bones[bone.name]) for bone in obj.data.bones]
+
+            if bake_pose:
+                # Deform bones are read from the evaluated rig, so constraints and drivers are included
+                for bone, pose_bone in rig_bones[obj]:
+                    if bone.use_deform:
+                        bone_tracks.setdefault(bone.name, []).append({
+                            "object": obj,
+                            "bone": bone,
+                            "pose_bone": pose_bone,
+                            "fcurves": {},
+                            "frames": set(),
+                            "baked": True,
+                            "samples": new_samples()
+                        })
+                continue
+
+            for bone, pose_bone in rig_bones[obj]:
+                # Check if bone has animation data
+                if fcurve_index is not None:
+                    bone_fcurves = fcurve_index.get(bone.name, {})
 
-                        bone_data["scale"][round(frame / bpy.context.scene.render.fps, 5)] = transformed_scale
+                    # Iterate through keyframes in the animation
+                    keyframes = set()
+                    for fcurves in bone_fcurves.values():
+                        for array_index, fc in fcurves:
+                            keyframes.update(keyframe_frames(fc))
+                    keyframes = keyed_frames(keyframes)
 
-                    # Add bone data to export_data
-                    if bone.name not in export_data["animations"][anim_id]["bones"]:
-                        export_data["animations"][anim_id]["bones"][bone.name] = {}
+                    # If there are no keyframes for the current bone, skip processing
+                    if not keyframes:
+                        print(f"Skipping bone {bone.name} in armature {obj.name} as it has no animation data.")
+                        continue
 
-                    export_data["animations"][anim_id]["bones"][bone.name].update(bone_data)
+                    track = {
+                        "object": obj,
+                        "bone": bone,
+                        "pose_bone": pose_bone,
+                        "fcurves": bone_fcurves,
+                        "frames": keyframes,
+                        "baked": False,
+                        "samples": new_samples()
+                    }
 
                 else:
                     # Skip bones with no animation data
                     print(f"Skipping bone {bone.name} in armature {obj.name} as it has no animation data.")
-                    
-        elif obj.animation_data and obj.animation_data.action:
-            # Check if object has animation data
-            bone_data = {
-                "rotation": {},
-                "position": {},
-                "scale": {}
-            }
+                    continue
+
+                bone_tracks.setdefault(bone.name, []).append(track)
+                for frame in keyframes:
+                    frame_tracks.setdefault(frame, []).append(track)
+
+        elif action:
+            if action not in fcurve_indexes:
+                fcurve_indexes[action] = build_fcurve_index(action)
 
             # Iterate through keyframes in the animation
             keyframes = set()
-            for fc in obj.animation_data.action.fcurves:
-                keyframes.update(int(k.co.x) for k in fc.keyframe_points)
+            for fc in action.fcurves:
+                keyframes.update(keyframe_frames(fc))
+            keyframes = keyed_frames(keyframes)
+
+            track = {
+                "object": obj,
+                "bone": None,
+                "pose_bone": None,
+                "fcurves": fcurve_indexes[action].get(None, {}),
+                "frames": keyframes,
+                "baked": False,
+                "samples": new_samples()
+            }
 
-            # Sort keyframes in ascending order
-            sorted_keyframes = sorted(keyframes)
+            bone_tracks.setdefault(obj.name, []).append(track)
+            for frame in keyframes:
+                frame_tracks.setdefault(frame, []).append(track)
+        else:
+            # Skip objects with no animation data
+            print(f"Skipping {obj.name} as it has no animation data.")
 
-            for frame in sorted_keyframes:
+    return bone_tracks, frame_tracks
+
+def assign_clip_actions(clip):
+    # Make each object play only the clip's action so the scene evaluates it alone,
+    # returning what to restore afterwards
+    previous = []
+    for obj, action in clip["actions"]:
+        animation_data = obj.animation_data or obj.animation_data_create()
+        previous.append((animation_data, animation_data.action, animation_data.use_nla))
+        animation_data.use_nla = False
+        animation_data.action = action
+    return previous
+
+def restore_clip_actions(previous):
+    for animation_data, action, use_nla in reversed(previous):
+        animation_data.action = action
+        animation_data.use_nla = use_nla
+
+def skip_cached_bones(bone_tracks, frame_tracks, bone_cache, options):
+    # Key every bone and leave the ones already in the cache out of the frames to sample
+    cache_keys = {name: bone_cache_key(name, tracks, options) for name, tracks in bone_tracks.items()}
+    cached_tracks = {id(track) for name, tracks in bone_tracks.items() if cache_keys[name] in bone_cache for track in tracks}
+
+    for frame in list(frame_tracks):
+        frame_tracks[frame] = [track for track in frame_tracks[frame] if id(track) not in cached_tracks]
+        if not frame_tracks[frame]:
+            del frame_tracks[frame]
+
+    return cache_keys
+
+def sample_clip(clip, frame_tracks, evaluate_fcurves, swap_actions):
+    # Batch clips are not the objects' active actions, so swap them in while the scene is sampled.
+    # Yields after every frame so a modal export can pause between them.
+    previous_actions = assign_clip_actions(clip) if swap_actions else []
+
+    try:
+        # Sweep the combined timeline once, sampling every track keyed on each frame
+        for frame in sorted(frame_tracks):
+            # Baked actions already hold every value, so the scene only needs updating when reading it back
+            if not evaluate_fcurves:
                 bpy.context.scene.frame_set(frame)
 
-                # Check if the rotation mode is XYZ
-                if obj.rotation_mode == 'XYZ':
-                    # Use raw Euler angles without conversions
-                    rotation_data = [round(math.degrees(angle), 5) for angle in obj.rotation_euler]
-                    rotation_data[0] = -rotation_data[0]
+            for track in frame_tracks[frame]:
+                if track["bone"] is not None:
+                    pose_bone = track["pose_bone"]
+                    if evaluate_fcurves:
+                        pose_bone = evaluate_fcurve_channels(pose_bone, track["fcurves"], frame)
+                    sample_pose_bone(track["samples"], pose_bone, frame)
                 else:
-                    # Convert to degrees and invert specific axes if needed, rounding to one decimal place
-                    rotation_data = [
-                        float(Decimal(math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)) if axis not in invert_rotation_axes 
-                        else float(Decimal(-math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
-                        for axis, angle in enumerate(quaternion_to_euler_xyz(obj.rotation_quaternion))
-                    ]
-
-                # Check if the rotation data is non-zero before inverting
-                if any(invert_rotation_axes):
-                    rotation_data = [(-angle if invert_rotation_axes[axis] else angle) for axis, angle in enumerate(rotation_data)]
-
-                # Multiply rotation values by the rotation multiplier
-                rotation_data = [angle * ROTATION_MULTIPLIER for angle in rotation_data]
-                
-                # Invert Rotation X & Z
-                rotation_data[0] = -rotation_data[0]
-                rotation_data[2] = -rotation_data[2]
-                
-                # Swap Y and Z values for rotation
-                rotation_data = [rotation_data[0], rotation_data[2], rotation_data[1]]
-
-                # Add the modified rotation data to bone_data
-                bone_data["rotation"][round(frame / context.scene.render.fps, 5)] = rotation_data.copy()
-
-                # Original position data
-                original_position = [round(coord, 5) for coord in obj.location]
-
-                # Swap Y and Z values for position
-                transformed_position = [original_position[0], original_position[2], original_position[1]]
-                
-                # Multiply position values by the multiplier
-                transformed_position = [coord * OBJ_POSITION_MULTIPLIER for coord in transformed_position]
-
-                # Position data
-                bone_data["position"][round(frame / context.scene.render.fps, 5)] = transformed_position.copy()
-
-                # Scale data
-                scale_data = [round(scale, 5) for scale in obj.scale]
-                bone_data["scale"][round(frame / context.scene.render.fps, 5)] = scale_data.copy()
-
-                # Swap Y and Z values for scale
-                transformed_scale = [scale_data[0], scale_data[2], scale_data[1]]
-                bone_data["scale"][round(frame / context.scene.render.fps, 5)] = transformed_scale.copy()
-
-                # Multiply scale values by the scale multiplier
-                transformed_scale = [coord * SCALE_MULTIPLIER for coord in transformed_scale]
-                bone_data["scale"][round(frame / context.scene.render.fps, 5)] = transformed_scale.copy()
-
-            # Add bone data to export_data
-            export_data["animations"][anim_id]["bones"][obj.name] = bone_data
+                    target = track["object"]
+                    if evaluate_fcurves:
+                        target = evaluate_fcurve_channels(target, track["fcurves"], frame)
+                    sample_object(track["samples"], target, frame)
+            yield
+    finally:
+        restore_clip_actions(previous_actions)
+
+def evaluated_local_pose(depsgraph, tracks):
+    # Each baked bone's final local transform as [*euler, *location, *scale], the same values Bake Action with visual keying writes
+    poses = []
+    evaluated_objects = {}
+
+    for track in tracks:
+        obj = track["object"]
+        if obj not in evaluated_objects:
+            evaluated_objects[obj] = obj.evaluated_get(depsgraph)
+        obj_eval = evaluated_objects[obj]
+
+        pose_bone = obj_eval.pose.bones[track["bone"].name]
+        matrix = obj_eval.convert_space(pose_bone=pose_bone, matrix=pose_bone.matrix, from_space='POSE', to_space='LOCAL')
+        location, rotation, scale = matrix.decompose()
+        poses.append([*rotation.to_euler('XYZ'), *location, *scale])
+
+    return poses
+
+def bake_clip(context, clip, bone_tracks, keyframe_tolerances, swap_actions):
+    # Sample the baked bones from the evaluated depsgraph at every frame, then key each bone only where its own
+    # motion strays past the tolerances. Yields after every frame like sample_clip.
+    tracks = [track for tracks in bone_tracks.values() for track in tracks if track["baked"]]
+    if not tracks:
+        return
+
+    frames = list(range(clip["frame_start"], clip["frame_end"] + 1))
+    bone_values = [[] for _ in tracks]
+
+    previous_actions = assign_clip_actions(clip) if swap_actions else []
+    try:
+        for frame in frames:
+            context.scene.frame_set(frame)
+            for values, pose in zip(bone_values, evaluated_local_pose(context.evaluated_depsgraph_get(), tracks)):
+                values.append(pose)
+            yield
+    finally:
+        restore_clip_actions(previous_actions)
+
+    for track, values in zip(tracks, bone_values):
+        key_frames, key_values = bake_key_frames(frames, values, keyframe_tolerances)
+        samples = track["samples"]
+        samples["frames"] = key_frames
+        samples["rotation"] = key_values[:, 0:3]
+        samples["location"] = key_values[:, 3:6]
+        samples["scale"] = key_values[:, 6:9]
+
+def clip_bones(bone_tracks, fps, invert_rotation_axes, invert_position_axes, reduce_keyframes, keyframe_tolerances, cache_keys=None, bone_cache=None, used_cache=None, anim_id=None, profile=None, expression_period=None, frame_offset=0):
+    # Convert one bone at a time so it can be written before the next is converted
+    for name, tracks in bone_tracks.items():
+        cache_key = cache_keys[name] if cache_keys else None
+
+        if cache_key is not None and cache_key in bone_cache:
+            bone_data = bone_cache[cache_key]
         else:
-            # Skip objects with no animation data
-            print(f"Skipping {obj.name} as it has no animation data.")
+            if profile is not None:
+                profile.bone(anim_id, name)["frames_sampled"] += sum(len(track["samples"]["frames"]) for track in tracks)
+
+            with profile_phase(profile, "convert"):
+                bone_data = convert_bone(
+                    [(track["bone"] is not None, track["samples"]) for track in tracks],
+                    fps, invert_rotation_axes, invert_position_axes, reduce_keyframes, keyframe_tolerances, expression_period, frame_offset
+                )
 
-    # Export to JSON
-    with open(filepath, 'w') as file:
-        json.dump(export_data, file, indent=4)
+        # Keep every bone of this export for the next one
+        if cache_key is not None:
+            used_cache[cache_key] = bone_data
+
+        # Samples are no longer needed once converted
+        for track in tracks:
+            track["samples"] = None
+
+        if bone_data is not None:
+            yield name, bone_data
+
+def export_steps(context, filepath, anim_id, loop, override, anim_time_update, blend_weight, start_delay, loop_delay, format_version, invert_rotation_axes, invert_position_axes, export_armature, evaluate_fcurves=False, reduce_keyframes=False, keyframe_tolerances=None, json_style='PRETTY', precisions=None, batch_mode='ACTIVE', anim_id_template="animation.{rig}.{action}", use_cache=False, profile=None, bake_pose=False, fit_expressions=False):
+    # The whole export as a generator, yielding the fraction done after every sampled frame and written bone.
+    # The file is only moved into place once the generator has run to the end.
+    # Ensure the file has a .json extension
+    if not filepath.lower().endswith('.json'):
+        filepath += '.json'
+
+    fps = context.scene.render.fps
+    keyframe_tolerances = keyframe_tolerances or DEFAULT_KEYFRAME_TOLERANCES
+
+    # Rig-level lookups shared by every clip
+    fcurve_indexes = {}
+    rig_bones = {}
+
+    with profile_phase(profile, "collect"):
+        clips = collect_clips(context, batch_mode, anim_id, anim_id_template, export_armature, fcurve_indexes)
+    swap_actions = batch_mode != 'ACTIVE' and not evaluate_fcurves
+
+    # Converted bones from the previous export to this file, reused for bones whose F-curves haven't changed
+    cache_path = filepath + ".cache"
+    bone_cache = None
+    if use_cache:
+        with profile_phase(profile, "cache"):
+            bone_cache = load_bone_cache(cache_path)
+    used_cache = {}
+
+    # Steps done and expected in the clip being exported
+    progress = {"clip": 0, "done": 0, "total": 1}
+
+    def clip_steps(clip_index, clip, header):
+        # The clip's bones, produced once the writer reaches them, with None after every sampled frame
+        with profile_phase(profile, "collect"):
+            bone_tracks, frame_tracks = collect_tracks(clip, export_armature, fcurve_indexes, rig_bones, bake_pose)
+
+        # Batch clips get their own animation length, so their keys are timed from the clip's first frame
+        frame_offset = clip["frame_start"] if batch_mode != 'ACTIVE' else 0
+
+        # Looping clips can have channels that repeat over the animation's length written as expressions
+        expression_period = None
+        if fit_expressions and header["loop"] is True and header["animation_length"] > 0:
+            expression_period = header["animation_length"]
+
+        cache_keys = None
+        if use_cache:
+            with profile_phase(profile, "cache"):
+                options = bone_cache_options(fps, invert_rotation_axes, invert_position_axes, reduce_keyframes, keyframe_tolerances, expression_period, frame_offset) + repr(evaluate_fcurves)
+                cache_keys = skip_cached_bones(bone_tracks, frame_tracks, bone_cache, options)
+
+        # Baking evaluates every frame of the clip
+        bake_frames = clip["frame_end"] - clip["frame_start"] + 1 if bake_pose else 0
+        progress.update(clip=clip_index, done=0, total=len(frame_tracks) + bake_frames + len(bone_tracks))
+
+        with profile_phase(profile, "evaluate"):
+            steps = sample_clip(clip, frame_tracks, evaluate_fcurves, swap_actions)
+            if bake_pose:
+                steps = itertools.chain(steps, bake_clip(context, clip, bone_tracks, keyframe_tolerances, batch_mode != 'ACTIVE'))
+            for _ in steps:
+                progress["done"] += 1
+                yield None
+
+        for bone in clip_bones(
+            bone_tracks, fps, invert_rotation_axes, invert_position_axes, reduce_keyframes, keyframe_tolerances,
+            cache_keys, bone_cache, used_cache, clip["anim_id"], profile, expression_period, frame_offset
+        ):
+            progress["done"] += 1
+            yield bone
+
+    def animations():
+        # Each clip is only sampled once the writer reaches its bones
+        for clip_index, clip in enumerate(clips):
+            header = animation_header(
+                loop, clip["frame_start"], clip["frame_end"], fps, override,
+                anim_time_update, blend_weight, start_delay, loop_delay
+            )
+            yield clip["anim_id"], header, clip_steps(clip_index, clip, header)
+
+    # Export to JSON, writing each bone as soon as it has been converted
+    with profile_phase(profile, "serialize"):
+        with open_atomic(filepath) as file:
+            for _ in animation_file_steps(file, format_version, animations(), json_style == 'PRETTY', precisions, profile):
+                yield (progress["clip"] + min(progress["done"] / max(progress["total"], 1), 1.0)) / len(clips)
+
+    # Only bones used by this export are kept, so the cache doesn't grow with every edit
+    if use_cache:
+        with profile_phase(profile, "cache"):
+            save_bone_cache(cache_path, used_cache)
+
+    if profile is not None:
+        profile.finish()
+
+# Inside the export_minecraft_animation function, modify the rotation and position data accordingly
+def export_minecraft_animation(context, filepath, anim_id, loop, override, anim_time_update, blend_weight, start_delay, loop_delay, format_version, invert_rotation_axes, invert_position_axes, export_armature, evaluate_fcurves=False, reduce_keyframes=False, keyframe_tolerances=None, json_style='PRETTY', precisions=None, batch_mode='ACTIVE', anim_id_template="animation.{rig}.{action}", use_cache=False, profile=None, bake_pose=False, fit_expressions=False):
+    # Run every step of the export at once
+    for _ in export_steps(
+        context, filepath, anim_id, loop, override, anim_time_update, blend_weight, start_delay, loop_delay,
+        format_version, invert_rotation_axes, invert_position_axes, export_armature, evaluate_fcurves,
+        reduce_keyframes, keyframe_tolerances, json_style, precisions, batch_mode, anim_id_template,
+        use_cache, profile, bake_pose, fit_expressions
+    ):
+        pass
 
     return {'FINISHED'}
 
@@ -258,6 +583,14 @@ class ExportMinecraftAnimation(bpy.types.Operator):
     format_version: bpy.props.EnumProperty(name="Format Version", items=[(ver, ver, "") for ver in FORMAT_VERSIONS], default="1.8.0")
     anim_id: bpy.props.StringProperty(name="Animation ID", default="animation.blender.exported")
     export_armature: bpy.props.BoolProperty(name="Export Armature", default=False)
+
+    batch_mode_options = [("ACTIVE", "Active Action", ""), ("ACTIONS", "All Actions", ""), ("NLA", "NLA Strips", "")]
+    batch_mode: bpy.props.EnumProperty(name="Batch Mode", items=batch_mode_options, default="ACTIVE")
+    anim_id_template: bpy.props.StringProperty(name="Batch Animation ID", default="animation.{rig}.{action}")
+    use_cache: bpy.props.BoolProperty(name="Reuse Unchanged Bones", default=False)
+    report_timings: bpy.props.BoolProperty(name="Report Timings", default=False)
+    write_trace: bpy.props.BoolProperty(name="Write Timing Trace", default=False)
+    run_modal: bpy.props.BoolProperty(name="Keep Blender Responsive", default=False)
     
     loop_options = [("Play Once", "Play Once", ""), ("Loop", "Loop", ""), ("Hold On Last Frame", "Hold On Last Frame", "")]
     loop: bpy.props.EnumProperty(name="Loop", items=loop_options, default="Play Once")
@@ -266,6 +599,20 @@ class ExportMinecraftAnimation(bpy.types.Operator):
     start_delay: bpy.props.StringProperty(name="Start Delay", default="")
     blend_weight: bpy.props.StringProperty(name="Blend Weight", default="")
     anim_time_update: bpy.props.StringProperty(name="Animation Time Update", default="")
+    evaluate_fcurves: bpy.props.BoolProperty(name="Evaluate F-Curves Directly", default=False)
+    bake_pose: bpy.props.BoolProperty(name="Bake Final Pose", default=False)
+
+    reduce_keyframes: bpy.props.BoolProperty(name="Reduce Keyframes", default=False)
+    rotation_tolerance: bpy.props.FloatProperty(name="Rotation Tolerance", default=0.1, min=0.0)
+    position_tolerance: bpy.props.FloatProperty(name="Position Tolerance", default=0.01, min=0.0)
+    scale_tolerance: bpy.props.FloatProperty(name="Scale Tolerance", default=0.001, min=0.0)
+    fit_expressions: bpy.props.BoolProperty(name="Fit Loops To Expressions", default=False)
+
+    json_style_options = [("PRETTY", "Pretty", ""), ("MINIFIED", "Minified", "")]
+    json_style: bpy.props.EnumProperty(name="JSON Style", items=json_style_options, default="PRETTY")
+    rotation_precision: bpy.props.IntProperty(name="Rotation Precision", default=DEFAULT_PRECISIONS["rotation"], min=0, max=10)
+    position_precision: bpy.props.IntProperty(name="Position Precision", default=DEFAULT_PRECISIONS["position"], min=0, max=10)
+    scale_precision: bpy.props.IntProperty(name="Scale Precision", default=DEFAULT_PRECISIONS["scale"], min=0, max=10)
 
     invert_rotation_X: bpy.props.BoolProperty(name="Invert Rotation X", default=False)
     invert_rotation_Y: bpy.props.BoolProperty(name="Invert Rotation Y", default=False)
@@ -283,14 +630,98 @@ class ExportMinecraftAnimation(bpy.types.Operator):
     def execute(self, context):
         invert_rotation_axes = [self.invert_rotation_X, self.invert_rotation_Y, self.invert_rotation_Z]
         invert_position_axes = [self.invert_position_X, self.invert_position_Y, self.invert_position_Z]
+        keyframe_tolerances = {"rotation": self.rotation_tolerance, "position": self.position_tolerance, "scale": self.scale_tolerance}
+        precisions = {"rotation": self.rotation_precision, "position": self.position_precision, "scale": self.scale_precision}
+        self.profile = PhaseProfile() if self.report_timings or self.write_trace else None
 
-        return export_minecraft_animation(
-            context, self.filepath, self.anim_id, self.loop, self.override,
+        # A modal export outlives this call's context, so it reads the current one through bpy.context instead
+        self.steps = export_steps(
+            bpy.context if self.run_modal else context, self.filepath, self.anim_id, self.loop, self.override,
             self.anim_time_update, self.blend_weight, self.start_delay,
             self.loop_delay, self.format_version, invert_rotation_axes,
-            invert_position_axes, self.export_armature
+            invert_position_axes, self.export_armature, self.evaluate_fcurves,
+            self.reduce_keyframes, keyframe_tolerances, self.json_style, precisions,
+            self.batch_mode, self.anim_id_template, self.use_cache, self.profile,
+            self.bake_pose, self.fit_expressions
         )
 
+        if not self.run_modal:
+            for _ in self.steps:
+                pass
+            return self.finish(context)
+
+        # Step through the export on a timer, showing progress until it finishes or Esc is pressed
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(MODAL_TIMER_INTERVAL, window=context.window)
+        self.idle_phase = None
+        wm.progress_begin(0, 100)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.cancel(context)
+            self.report({'WARNING'}, "Export cancelled")
+            return {'CANCELLED'}
+
+        # Let the view be moved around while exporting, but keep everything else from changing the scene
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'} if event.type in MODAL_PASS_THROUGH_EVENTS else {'RUNNING_MODAL'}
+
+        # Time spent in the rest of Blender between steps is kept out of the export's phases
+        if self.idle_phase is not None:
+            self.idle_phase.__exit__(None, None, None)
+            self.idle_phase = None
+
+        # Run as many steps as fit in the time budget, so slow steps run fewer at a time and fast ones more
+        deadline = time.perf_counter() + MODAL_STEP_BUDGET
+        try:
+            fraction = next(self.steps)
+            while time.perf_counter() < deadline:
+                fraction = next(self.steps)
+        except StopIteration:
+            self.stop_modal(context)
+            return self.finish(context)
+        except Exception:
+            self.stop_modal(context)
+            raise
+
+        context.window_manager.progress_update(int(fraction * 100))
+        context.workspace.status_text_set(f"Exporting animation {fraction:.0%}, press Esc to cancel")
+
+        if self.profile is not None:
+            self.idle_phase = self.profile.phase("ui")
+            self.idle_phase.__enter__()
+        return {'RUNNING_MODAL'}
+
+    def cancel(self, context):
+        # Closing the steps leaves any existing file untouched and puts swapped actions back
+        if self.idle_phase is not None:
+            self.idle_phase.__exit__(None, None, None)
+            self.idle_phase = None
+        self.steps.close()
+        self.stop_modal(context)
+
+    def stop_modal(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    def finish(self, context):
+        profile = self.profile
+        if profile is not None:
+            if self.report_timings:
+                for line in profile.summary():
+                    self.report({'INFO'}, line)
+
+            # The trace is JSON, but kept out of .json files so resource packs don't pick it up
+            if self.write_trace:
+                filepath = self.filepath if self.filepath.lower().endswith('.json') else self.filepath + '.json'
+                profile.write_trace(filepath + ".trace")
+
+        return {'FINISHED'}
+
     def invoke(self, context, event):
         wm = context.window_manager
         wm.fileselect_add(self)
@@ -0,0 +1,233 @@
+import bpy
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Run from the command line with:
+#   blender -b -P "Minecraft-Animatic-(Batch Export).py" -- --manifest manifest.json
+#
+# The manifest lists the .blend files to export, paths are relative to the manifest:
+# {
+#     "options": {"format_version": "1.12.0", "export_armature": true},
+#     "jobs": [
+#         {
+#             "blend": "rigs/zombie.blend",
+#             "output": "animations/zombie.animation.json",
+#             "objects": ["ZombieRig"],
+#             "action": "zombie_walk",
+#             "options": {"anim_id": "animation.zombie.walk", "loop": "Loop"}
+#         }
+#     ]
+# }
+#
+# "objects" defaults to every object with animation data, "action" to the objects' active action.
+# Job options override the manifest options, which override the export menu defaults below.
+
+SCRIPT_PATH = os.path.abspath(__file__)
+EXPORTER_PATH = os.path.join(os.path.dirname(SCRIPT_PATH), "Minecraft-Animatic-(Animation to Json).py")
+
+# The shared defaults live in minecraft_animatic_core.py next to this script
+if os.path.dirname(SCRIPT_PATH) not in sys.path:
+    sys.path.append(os.path.dirname(SCRIPT_PATH))
+
+from minecraft_animatic_core import DEFAULT_KEYFRAME_TOLERANCES, DEFAULT_PRECISIONS
+
+# Same defaults as the export menu
+DEFAULT_OPTIONS = {
+    "anim_id": "animation.blender.exported",
+    "loop": "Play Once",
+    "override": False,
+    "anim_time_update": "",
+    "blend_weight": "",
+    "start_delay": "",
+    "loop_delay": "",
+    "format_version": "1.8.0",
+    "invert_rotation_axes": [False, False, False],
+    "invert_position_axes": [False, False, False],
+    "export_armature": False,
+    "evaluate_fcurves": False,
+    "reduce_keyframes": False,
+    "keyframe_tolerances": dict(DEFAULT_KEYFRAME_TOLERANCES),
+    "json_style": "PRETTY",
+    "precisions": dict(DEFAULT_PRECISIONS),
+    "batch_mode": "ACTIVE",
+    "anim_id_template": "animation.{rig}.{action}",
+    "use_cache": False,
+    "bake_pose": False,
+    "fit_expressions": False,
+}
+
+def load_exporter():
+    spec = importlib.util.spec_from_file_location("minecraft_animatic_exporter", EXPORTER_PATH)
+    exporter = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(exporter)
+    return exporter
+
+def read_manifest(manifest_path):
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    shared_options = manifest.get("options", {})
+
+    # Group jobs by .blend file so each worker opens its file once
+    blend_jobs = {}
+    for job in manifest["jobs"]:
+        blend = os.path.normpath(os.path.join(base_dir, job["blend"]))
+        blend_jobs.setdefault(blend, []).append({
+            "blend": blend,
+            "output": os.path.normpath(os.path.join(base_dir, job["output"])),
+            "objects": job.get("objects"),
+            "action": job.get("action"),
+            "options": {**DEFAULT_OPTIONS, **shared_options, **job.get("options", {})},
+        })
+
+    return blend_jobs
+
+def select_job_objects(job):
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+
+    if job["objects"] is None:
+        objects = [obj for obj in bpy.context.view_layer.objects if obj.animation_data]
+    else:
+        objects = [bpy.data.objects[name] for name in job["objects"]]
+
+    for obj in objects:
+        obj.select_set(True)
+
+        # Play the requested action on every selected object
+        if job["action"] is not None:
+            animation_data = obj.animation_data or obj.animation_data_create()
+            animation_data.action = bpy.data.actions[job["action"]]
+
+    if objects:
+        bpy.context.view_layer.objects.active = objects[0]
+
+def run_worker(jobs_path, result_path):
+    # Runs inside a background Blender that has the job's .blend file open
+    with open(jobs_path) as file:
+        jobs = json.load(file)
+
+    exporter = load_exporter()
+    results = []
+
+    for job in jobs:
+        start = time.perf_counter()
+        result = {"blend": job["blend"], "output": job["output"]}
+
+        try:
+            select_job_objects(job)
+            os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+            exporter.export_minecraft_animation(bpy.context, job["output"], **job["options"])
+            result["status"] = "ok"
+        except Exception:
+            result["status"] = "failed"
+            result["error"] = traceback.format_exc()
+
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        results.append(result)
+
+    with open(result_path, 'w') as file:
+        json.dump(results, file)
+
+def export_blend(blend, jobs, work_dir, index, timeout=None):
+    # Export one .blend file in its own background Blender process, killing it after timeout seconds
+    jobs_path = os.path.join(work_dir, f"jobs_{index}.json")
+    result_path = os.path.join(work_dir, f"result_{index}.json")
+
+    with open(jobs_path, 'w') as file:
+        json.dump(jobs, file)
+
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            [bpy.app.binary_path, "-b", blend, "-P", SCRIPT_PATH, "--", "--worker", jobs_path, "--result", result_path],
+            capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        process = None
+    seconds = round(time.perf_counter() - start, 3)
+
+    if process is None:
+        # The process was killed before reporting, so every job in it failed
+        error = f"Blender took longer than the {timeout}s timeout"
+        results = [{"blend": job["blend"], "output": job["output"], "status": "failed", "error": error} for job in jobs]
+    elif os.path.exists(result_path):
+        with open(result_path) as file:
+            results = json.load(file)
+    else:
+        # The process died before reporting, so every job in it failed
+        error = process.stderr.strip() or process.stdout.strip() or f"Blender exited with code {process.returncode}"
+        results = [{"blend": job["blend"], "output": job["output"], "status": "failed", "error": error} for job in jobs]
+
+    return {"blend": blend, "seconds": seconds, "jobs": results}
+
+def run_pool(manifest_path, workers, summary_path, timeout=None):
+    blend_jobs = read_manifest(manifest_path)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(blend_jobs) or 1))
+
+    print(f"Exporting {sum(len(jobs) for jobs in blend_jobs.values())} animations from {len(blend_jobs)} files with {workers} workers.")
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as work_dir:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(export_blend, blend, jobs, work_dir, index, timeout) for index, (blend, jobs) in enumerate(blend_jobs.items())]
+            files = [future.result() for future in futures]
+
+    jobs = [job for blend_file in files for job in blend_file["jobs"]]
+    failures = [job for job in jobs if job["status"] != "ok"]
+
+    summary = {
+        "seconds": round(time.perf_counter() - start, 3),
+        "workers": workers,
+        "exported": len(jobs) - len(failures),
+        "failed": len(failures),
+        "files": files,
+    }
+
+    for blend_file in files:
+        print(f"{blend_file['seconds']:8.2f}s  {blend_file['blend']}")
+        for job in blend_file["jobs"]:
+            if job["status"] != "ok":
+                print(f"    FAILED {job['output']}\n{job['error']}")
+
+    print(f"Exported {summary['exported']} animations in {summary['seconds']:.2f}s, {summary['failed']} failed.")
+
+    if summary_path:
+        with open(summary_path, 'w') as file:
+            json.dump(summary, file, indent=4)
+
+    return summary
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(prog="Minecraft-Animatic-(Batch Export).py")
+    parser.add_argument("--manifest", help="JSON manifest of .blend files and export options")
+    parser.add_argument("--workers", type=int, default=0, help="Number of Blender processes, defaults to the CPU count")
+    parser.add_argument("--summary", help="Write the timing and failure summary to this JSON file")
+    parser.add_argument("--timeout", type=float, default=0, help="Seconds each Blender process may run before its jobs count as failed, no limit by default")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.result)
+        return
+
+    if not args.manifest:
+        parser.error("--manifest is required")
+
+    summary = run_pool(args.manifest, args.workers, args.summary, args.timeout or None)
+    sys.exit(1 if summary["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import bpy
+from bpy_extras.io_utils import ImportHelper
+import json
+import os
+import sys
+
+import numpy as np
+
+# The conversion itself lives in minecraft_animatic_core.py next to this script so it can also run without Blender
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from minecraft_animatic_core import parse_channel, revert_pose_bone_channels, revert_object_channels, euler_to_quaternion
+
+# Keyframe interpolation values as stored by foreach_set
+LINEAR_INTERPOLATION = 1
+
+# Blender channel each Minecraft channel is written to
+CHANNEL_PATHS = {"position": "location", "scale": "scale"}
+
+def add_fcurve(action, data_path, array_index, group, frames, values):
+    # Create the F-curve with all of its keyframes in one go instead of inserting them one by one
+    fc = action.fcurves.new(data_path, index=array_index, action_group=group)
+    fc.keyframe_points.add(len(frames))
+
+    co = np.empty(len(frames) * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+    fc.keyframe_points.foreach_set('co', co)
+    fc.keyframe_points.foreach_set('interpolation', np.full(len(frames), LINEAR_INTERPOLATION, dtype=np.int32))
+
+    # Recalculate the handles now that every keyframe is in place
+    fc.update()
+
+def add_bone_fcurves(action, path_prefix, group, channel_keys, euler_mode):
+    for channel, (frames, values) in channel_keys.items():
+        if channel == "rotation":
+            # Quaternion targets get their rotation converted back from the exported euler angles
+            if euler_mode:
+                data_path, values = "rotation_euler", values
+            else:
+                data_path, values = "rotation_quaternion", euler_to_quaternion(values)
+        else:
+            data_path = CHANNEL_PATHS[channel]
+
+        for array_index in range(values.shape[1]):
+            add_fcurve(action, path_prefix + data_path, array_index, group, frames, values[:, array_index])
+
+def bone_channel_keys(bone, fps):
+    # Key frames and values of every channel of an exported bone, before its axes are reverted
+    keys = {}
+    skipped = 0
+
+    for channel in ("rotation", "position", "scale"):
+        if channel not in bone:
+            continue
+
+        times, values, channel_skipped = parse_channel(bone[channel])
+        skipped += channel_skipped
+        # Times are written to 5 decimals, so round away the error that leaves on frame numbers
+        if len(times):
+            keys[channel] = (np.round(times * fps, 2), values)
+
+    return keys, skipped
+
+def revert_keys(keys, revert):
+    # Run the reverted conversion over every channel's values, keeping each channel's own frames
+    reverted = revert({channel: values for channel, (frames, values) in keys.items()})
+    return {channel: (keys[channel][0], values) for channel, values in reverted.items()}
+
+def import_minecraft_animation(context, filepath, import_armature, invert_rotation_axes, invert_position_axes):
+    with open(filepath) as file:
+        animation_file = json.load(file)
+
+    animations = animation_file.get("animations", {}) if isinstance(animation_file, dict) else None
+    if not isinstance(animations, dict):
+        raise ValueError("Not a Bedrock animation file")
+
+    fps = context.scene.render.fps
+    armature = context.active_object if import_armature else None
+    if import_armature and (armature is None or armature.type != 'ARMATURE'):
+        raise ValueError("Select the armature to import onto")
+
+    # Look up targets by name once instead of per bone and animation
+    if import_armature:
+        targets = {pose_bone.name: pose_bone for pose_bone in armature.pose.bones}
+    else:
+        targets = {obj.name: obj for obj in context.scene.objects}
+
+    # Read every animation before creating any actions, so a malformed file leaves nothing behind
+    animation_keys = []
+    skipped_keys = 0
+
+    for anim_id, animation in animations.items():
+        bones = animation.get("bones", {}) if isinstance(animation, dict) else None
+        if not isinstance(bones, dict) or not all(isinstance(bone, dict) for bone in bones.values()):
+            raise ValueError(f"{anim_id} is not a Bedrock animation")
+
+        bone_keys = []
+        for name, bone in bones.items():
+            target = targets.get(name)
+            if target is None:
+                print(f"Skipping bone {name} in {anim_id} as there is no {'bone' if import_armature else 'object'} with that name.")
+                continue
+
+            keys, skipped = bone_channel_keys(bone, fps)
+            skipped_keys += skipped
+            euler_mode = target.rotation_mode == 'XYZ'
+
+            if import_armature:
+                keys = revert_keys(keys, lambda channels: revert_pose_bone_channels(channels, invert_rotation_axes, invert_position_axes))
+            else:
+                keys = revert_keys(keys, lambda channels: revert_object_channels(channels, invert_rotation_axes, euler_mode))
+            bone_keys.append((name, target, keys, euler_mode))
+
+        animation_keys.append((anim_id, bone_keys))
+
+    actions = []
+    for anim_id, bone_keys in animation_keys:
+        action = bpy.data.actions.new(anim_id) if import_armature else None
+        if action is not None:
+            action.use_fake_user = True
+            actions.append((armature, action))
+
+        for name, target, keys, euler_mode in bone_keys:
+            if import_armature:
+                escaped_name = name.replace('\\', '\\\\').replace('"', '\\"')
+                path_prefix = f'pose.bones["{escaped_name}"].'
+                add_bone_fcurves(action, path_prefix, name, keys, euler_mode)
+            else:
+                # Each object gets its own action, like the ones the exporter reads from
+                object_action = bpy.data.actions.new(f"{anim_id}.{name}")
+                object_action.use_fake_user = True
+                actions.append((target, object_action))
+                add_bone_fcurves(object_action, "", "Object Transforms", keys, euler_mode)
+
+    return actions, skipped_keys
+
+class ImportMinecraftAnimation(bpy.types.Operator, ImportHelper):
+    bl_idname = "import_anim.minecraft_animation"
+    bl_label = "Import"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(
+        default="*.json",
+        options={'HIDDEN'},
+    )
+    files: bpy.props.CollectionProperty(type=bpy.types.OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'})
+    directory: bpy.props.StringProperty(subtype='DIR_PATH', options={'HIDDEN', 'SKIP_SAVE'})
+
+    import_armature: bpy.props.BoolProperty(name="Import To Armature", default=False)
+
+    invert_rotation_X: bpy.props.BoolProperty(name="Invert Rotation X", default=False)
+    invert_rotation_Y: bpy.props.BoolProperty(name="Invert Rotation Y", default=False)
+    invert_rotation_Z: bpy.props.BoolProperty(name="Invert Rotation Z", default=False)
+
+    invert_position_X: bpy.props.BoolProperty(name="Invert Position X", default=False)
+    invert_position_Y: bpy.props.BoolProperty(name="Invert Position Y", default=False)
+    invert_position_Z: bpy.props.BoolProperty(name="Invert Position Z", default=False)
+
+    def execute(self, context):
+        invert_rotation_axes = [self.invert_rotation_X, self.invert_rotation_Y, self.invert_rotation_Z]
+        invert_position_axes = [self.invert_position_X, self.invert_position_Y, self.invert_position_Z]
+
+        # Several files can be picked at once
+        filepaths = [os.path.join(self.directory, file.name) for file in self.files if file.name] or [self.filepath]
+
+        actions = []
+        skipped_keys = 0
+        imported_files = 0
+        for filepath in filepaths:
+            # A file that can't be read is skipped so the files before it keep their actions
+            try:
+                file_actions, file_skipped = import_minecraft_animation(context, filepath, self.import_armature, invert_rotation_axes, invert_position_axes)
+            except (OSError, ValueError) as error:
+                self.report({'WARNING'}, f"Could not import {filepath}: {error}")
+                continue
+            actions.extend(file_actions)
+            skipped_keys += file_skipped
+            imported_files += 1
+
+        if not imported_files:
+            self.report({'ERROR'}, "None of the selected files could be imported.")
+            return {'CANCELLED'}
+
+        # Play the first imported animation, the rest are kept as actions to switch to
+        assigned = set()
+        for obj, action in actions:
+            if obj not in assigned:
+                animation_data = obj.animation_data or obj.animation_data_create()
+                animation_data.action = action
+                assigned.add(obj)
+
+        if skipped_keys:
+            self.report({'WARNING'}, f"Skipped {skipped_keys} keys that aren't plain numbers, such as Molang expressions.")
+        self.report({'INFO'}, f"Imported {len(actions)} actions from {imported_files} of {len(filepaths)} files.")
+        return {'FINISHED'}
+
+# Register the operator
+def menu_func_import(self, context):
+    self.layout.operator(ImportMinecraftAnimation.bl_idname, text="Import Minecraft Animation (.json)")
+
+def register():
+    bpy.utils.register_class(ImportMinecraftAnimation)
+    bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
+
+def unregister():
+    bpy.utils.unregister_class(ImportMinecraftAnimation)
+    bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
+
+if __name__ == "__main__":
+    register()
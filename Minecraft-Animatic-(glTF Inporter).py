@@ -1,7 +1,100 @@
 import bpy
 import math
+import os
+import sys
+from mathutils import Matrix
 from bpy_extras.io_utils import ImportHelper
 
+# The glTF animation converter lives in minecraft_animatic_gltf.py next to this script so it can also run without Blender
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from minecraft_animatic_core import PhaseProfile, profile_phase
+from minecraft_animatic_gltf import convert_gltf_animation
+
+def index_imported_objects(objects):
+    # Order the imported objects parents first, and find the "Node_" roots the importer wraps the model in
+    imported = set(objects)
+    children = {}
+    top_level = []
+
+    for obj in objects:
+        if obj.parent in imported:
+            children.setdefault(obj.parent, []).append(obj)
+        else:
+            top_level.append(obj)
+
+    ordered = []
+    stack = list(reversed(top_level))
+    while stack:
+        obj = stack.pop()
+        ordered.append(obj)
+        stack.extend(reversed(children.get(obj, [])))
+
+    roots = [obj for obj in ordered if "Node_" in obj.name]
+    return ordered, roots, children
+
+def ancestors(obj):
+    while obj.parent is not None:
+        obj = obj.parent
+        yield obj
+
+def descendants(objects, children):
+    # Every object below the given ones in the imported hierarchy
+    found = []
+    stack = [child for obj in objects for child in children.get(obj, [])]
+    while stack:
+        obj = stack.pop()
+        found.append(obj)
+        stack.extend(children.get(obj, []))
+    return found
+
+def bake_empty_rotations(ordered, roots):
+    # Work out every imported object's world matrix from its local transforms, since the scene isn't updated yet
+    world = {}
+    for obj in ordered:
+        if obj.parent in world:
+            parent_world = world[obj.parent]
+        else:
+            parent_world = obj.parent.matrix_world if obj.parent else Matrix()
+        world[obj] = parent_world @ obj.matrix_parent_inverse @ obj.matrix_basis
+
+    # Empties keep their world location and scale but lose their rotation,
+    # everything else keeps its full world matrix
+    baked = {}
+    for obj in ordered:
+        if obj.type == 'EMPTY':
+            location, rotation, scale = world[obj].decompose()
+            baked[obj] = Matrix.Translation(location) @ Matrix.Diagonal(scale).to_4x4()
+        else:
+            baked[obj] = world[obj]
+
+    removed = set(roots)
+    for obj in ordered:
+        if obj in removed:
+            continue
+
+        # Children of the removed roots are left without a parent
+        orphaned = obj.parent in removed
+        if orphaned:
+            obj.parent = None
+
+        if obj.type == 'EMPTY':
+            # Move the baked transform into the deltas, leaving the transform channels at rest
+            location, rotation, scale = baked[obj].decompose()
+            obj.rotation_mode = 'XYZ'
+            obj.location, obj.rotation_euler, obj.scale = (0, 0, 0), (0, 0, 0), (1, 1, 1)
+            obj.delta_location, obj.delta_rotation_euler, obj.delta_scale = location, (0, 0, 0), scale
+            obj.delta_rotation_quaternion = (1, 0, 0, 0)
+
+        # Parent inverses cancel out whatever the parent's matrix became
+        if obj.parent is not None:
+            parent_world = baked[obj.parent] if obj.parent in baked else obj.parent.matrix_world
+            obj.matrix_parent_inverse = parent_world.inverted_safe() @ baked[obj] @ obj.matrix_basis.inverted_safe()
+        elif orphaned and obj.type != 'EMPTY':
+            obj.matrix_basis = baked[obj]
+
 class MinecraftGltfImportOperator(bpy.types.Operator, ImportHelper):
     bl_idname = "import_scene.minecraft_gltf"
     bl_label = "Minecraft glTF (.gltf)"
@@ -13,112 +106,129 @@ class MinecraftGltfImportOperator(bpy.types.Operator, ImportHelper):
         options={'HIDDEN'},
     )
 
+    report_timings: bpy.props.BoolProperty(name="Report Timings", default=False)
+    write_trace: bpy.props.BoolProperty(name="Write Timing Trace", default=False)
+
     def execute(self, context):
         filepath = self.filepath
-        bpy.ops.import_scene.gltf(filepath=filepath, filter_glob="*.gltf;*.glb", loglevel=30, import_pack_images=True, import_shading='NORMALS')
+        profile = PhaseProfile() if self.report_timings or self.write_trace else None
+
+        # Remember what was already in the file so only the new objects are processed
+        existing_objects = set(bpy.data.objects)
+        with profile_phase(profile, "import"):
+            bpy.ops.import_scene.gltf(filepath=filepath, filter_glob="*.gltf;*.glb", loglevel=30, import_pack_images=True, import_shading='NORMALS')
 
         # Special code to run after importing the file
         print("Running special code after importing Minecraft .gltf")
-        
-        # Clear all selected objects
-        bpy.ops.object.select_all(action='DESELECT')
-
-        # Iterate through all objects and select the one with the keyword "Node_"
-        selected_empty = None
-        for obj in bpy.data.objects:
-            if "Node_" in obj.name:
-                obj.select_set(True)
-                selected_empty = obj
-                bpy.context.view_layer.objects.active = obj
-
-        # Check if a valid empty is selected
-        if selected_empty:
-            # Rotate the selected empty's Z rotation to 180 degrees
-            quat_rot = selected_empty.rotation_quaternion
-            euler_rot = quat_rot.to_euler('XYZ')
-            euler_rot[2] = math.pi  # 180 degrees in radians
-            selected_empty.rotation_quaternion = euler_rot.to_quaternion()
-
-            # Print a message to confirm the rotation
-            print(f"Rotated {selected_empty.name}'s Z rotation to 180 degrees.")
-
-            # Select all empties directly parented to the selected empty
-            bpy.ops.object.select_grouped(type='CHILDREN_RECURSIVE')
 
-            # Set empties size and shapes
-            size, display_type = 0.05, 'CUBE'
+        self.post_process(context, existing_objects, profile)
+        if profile is not None:
+            profile.finish()
 
-            for obj in bpy.context.selected_objects:
-                if obj.type == 'EMPTY':
-                    obj.empty_display_size, obj.empty_display_type = size, display_type
-                    obj.show_in_front = True
+        if self.report_timings:
+            for line in profile.summary():
+                self.report({'INFO'}, line)
 
-            size_key, display_type_key = 0.3, 'SPHERE'
-            keyword = 'root'
+        # The trace is written next to the imported model
+        if self.write_trace:
+            profile.write_trace(filepath + ".trace")
 
-            for obj in bpy.context.selected_objects:
-                if obj.type == 'EMPTY' and keyword.lower() in obj.name.lower():
-                    obj.empty_display_size, obj.empty_display_type = size_key, display_type_key
-                    obj.show_in_front = True
+        # Return a result for the operator
+        return {'FINISHED'}
 
-            # Iterate through all objects and select the one with the keyword "Node_"
-            selected_empty = None
-            for obj in bpy.data.objects:
-                if "Node_" in obj.name:
-                    obj.select_set(True)
-                    selected_empty = obj
-                    bpy.context.view_layer.objects.active = obj
+    def post_process(self, context, existing_objects, profile):
+        # Index the imported objects and their hierarchy once
+        with profile_phase(profile, "index"):
+            imported_objects = [obj for obj in bpy.data.objects if obj not in existing_objects]
+            ordered, roots, children = index_imported_objects(imported_objects)
+
+        # Check if a valid empty is imported
+        if roots:
+            # Nested roots turn along with the top-most one
+            with profile_phase(profile, "rotate"):
+                for root in roots:
+                    if any(parent in roots for parent in ancestors(root)):
+                        continue
+
+                    # Rotate the root empty's Z rotation to 180 degrees
+                    quat_rot = root.rotation_quaternion
+                    euler_rot = quat_rot.to_euler('XYZ')
+                    euler_rot[2] = math.pi  # 180 degrees in radians
+                    root.rotation_quaternion = euler_rot.to_quaternion()
+
+                    # Print a message to confirm the rotation
+                    print(f"Rotated {root.name}'s Z rotation to 180 degrees.")
 
-            # Deselect objects that are not empties
-            bpy.ops.object.select_by_type(type='EMPTY', extend=False)
+            # Set empties size and shapes
+            size, display_type = 0.05, 'CUBE'
+            size_key, display_type_key = 0.3, 'SPHERE'
+            keyword = 'root'
 
-            # Set rotation mode
-            for obj in bpy.context.selected_objects:
-                obj.rotation_mode = 'XYZ'
+            with profile_phase(profile, "display"):
+                for obj in descendants(roots, children):
+                    if obj.type == 'EMPTY':
+                        if keyword.lower() in obj.name.lower():
+                            obj.empty_display_size, obj.empty_display_type = size_key, display_type_key
+                        else:
+                            obj.empty_display_size, obj.empty_display_type = size, display_type
+                        obj.show_in_front = True
 
-            # Apply rotation to selected empties
-            bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
+            # Apply the rotation of every imported empty and move its transforms to deltas
+            with profile_phase(profile, "bake"):
+                bake_empty_rotations(ordered, roots)
 
-            # Set transforms to deltas
-            bpy.ops.object.transforms_to_deltas(mode='ALL')
+            # Delete the root empties
+            with profile_phase(profile, "delete"):
+                for root in roots:
+                    bpy.data.objects.remove(root, do_unlink=True)
 
+            # Update the scene after deleting objects
+            with profile_phase(profile, "update"):
+                context.view_layer.update()
 
         # Clear all selected objects
-        bpy.ops.object.select_all(action='DESELECT')
+        for obj in context.selected_objects:
+            obj.select_set(False)
 
-        # Iterate through all objects and select the one with the keyword "Node_"
-        selected_empty = None
-        for obj in bpy.data.objects:
-            if "Node_" in obj.name:
-                obj.select_set(True)
-                selected_empty = obj
-                bpy.context.view_layer.objects.active = obj
+class MinecraftGltfAnimationConvertOperator(bpy.types.Operator, ImportHelper):
+    bl_idname = "import_scene.minecraft_gltf_animation"
+    bl_label = "Convert glTF Animation"
 
-        # Get the selected objects in the current scene
-        selected_objects = bpy.context.selected_objects
+    filename_ext = ".gltf"
+    filter_glob: bpy.props.StringProperty(
+        default="*.gltf;*.glb",
+        options={'HIDDEN'},
+    )
 
-        # Loop through selected objects and delete them
-        for obj in selected_objects:
-            bpy.data.objects.remove(obj, do_unlink=True)
+    anim_id_template: bpy.props.StringProperty(name="Animation ID", default="animation.{rig}.{action}")
+    loop_options = [("Play Once", "Play Once", ""), ("Loop", "Loop", ""), ("Hold On Last Frame", "Hold On Last Frame", "")]
+    loop: bpy.props.EnumProperty(name="Loop", items=loop_options, default="Play Once")
 
-        # Update the scene after deleting objects
-        bpy.context.view_layer.update()
+    def execute(self, context):
+        # Write the animations next to the model without importing it
+        output_path = os.path.splitext(self.filepath)[0] + ".animation.json"
 
-        # Clear all selected objects
-        bpy.ops.object.select_all(action='DESELECT')
+        try:
+            count = convert_gltf_animation(self.filepath, output_path, anim_id_template=self.anim_id_template, loop=self.loop)
+        except (OSError, ValueError, KeyError) as error:
+            self.report({'ERROR'}, f"Could not convert {self.filepath}: {error}")
+            return {'CANCELLED'}
 
-        # Return a result for the operator
+        self.report({'INFO'}, f"Converted {count} animations to {output_path}")
         return {'FINISHED'}
 
 def menu_func_import(self, context):
     self.layout.operator(MinecraftGltfImportOperator.bl_idname, text="Minecraft glTF Model (.gib/gltf)")
+    self.layout.operator(MinecraftGltfAnimationConvertOperator.bl_idname, text="Minecraft glTF Animation to Json (.glb/gltf)")
 
 def register():
     bpy.utils.register_class(MinecraftGltfImportOperator)
+    bpy.utils.register_class(MinecraftGltfAnimationConvertOperator)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
 
 def unregister():
     bpy.utils.unregister_class(MinecraftGltfImportOperator)
+    bpy.utils.unregister_class(MinecraftGltfAnimationConvertOperator)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Benchmarks the bpy-independent conversion and serialization on synthetic rigs, run with:
+#   python benchmarks/bench_core.py [--full] [--save results.json] [--baseline results.json]
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import minecraft_animatic_core as core
+
+# (bones, frames) per case, --full adds the largest rigs
+CASES = [(10, 100), (10, 20000), (100, 1000), (1000, 100)]
+FULL_CASES = [(100, 5000), (1000, 1000), (1000, 5000), (1000, 20000)]
+ROTATION_MODES = ["EULER", "QUATERNION"]
+
+# Fail a comparison when a case is this much slower than the baseline
+REGRESSION_THRESHOLD = 1.2
+
+def quaternion_to_euler(quaternions):
+    # XYZ euler angles from (w, x, y, z) quaternions
+    w, x, y, z = quaternions.T
+    return np.stack([
+        np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y)),
+        np.arcsin(np.clip(2 * (w * y - z * x), -1, 1)),
+        np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z)),
+    ], axis=1)
+
+def synthetic_tracks(bones, frames, rotation_mode, seed=0):
+    # Smooth float32 curves per bone, like a baked action with a key on every frame
+    rng = np.random.default_rng(seed)
+    frame_index = np.arange(frames, dtype=np.float64)[:, None]
+    tracks = []
+
+    for bone in range(bones):
+        phase, speed = rng.uniform(0, np.pi, (2, 1, 4))
+        wave = np.sin(frame_index * speed * 0.05 + phase)
+
+        if rotation_mode == 'QUATERNION':
+            quaternions = np.concatenate([np.ones((frames, 1)), wave[:, :3] * 0.5], axis=1)
+            quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+            rotation = quaternion_to_euler(quaternions)
+        else:
+            rotation = wave[:, :3] * np.pi / 4
+
+        samples = core.new_samples()
+        samples["frames"] = list(range(frames))
+        samples["euler_mode"] = [rotation_mode == 'EULER'] * frames
+        samples["rotation"] = rotation.astype(np.float32).astype(np.float64)
+        samples["location"] = (wave[:, 1:] * 0.5).astype(np.float32).astype(np.float64)
+        samples["scale"] = (1 + wave[:, :3] * 0.1).astype(np.float32).astype(np.float64)
+
+        # Alternate between armature bones and glTF empties
+        tracks.append((f"bone_{bone}", bone % 2 == 0, samples))
+
+    return tracks
+
+def convert(tracks, reduce_keyframes):
+    tolerances = {"rotation": 0.1, "position": 0.01, "scale": 0.001}
+    return [
+        (name, core.convert_bone([(is_pose_bone, samples)], 24, [False, False, False], [False, False, False], reduce_keyframes, tolerances))
+        for name, is_pose_bone, samples in tracks
+    ]
+
+def serialize(bones, pretty):
+    file = io.StringIO()
+    header = core.animation_header("Loop", 0, 100, 24, False, "", "", "", "")
+    core.write_animation_file(file, "1.8.0", [("animation.benchmark", header, iter(bones))], pretty)
+    return len(file.getvalue())
+
+def measure(function, *args):
+    # Time without tracing first, since tracemalloc slows allocation heavy code down
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def run_case(bones, frames, rotation_mode, reduce_keyframes):
+    tracks = synthetic_tracks(bones, frames, rotation_mode)
+
+    converted, convert_seconds, convert_peak = measure(convert, tracks, reduce_keyframes)
+    size, serialize_seconds, serialize_peak = measure(serialize, converted, False)
+
+    return {
+        "case": f"{bones}x{frames} {rotation_mode.lower()}{' reduced' if reduce_keyframes else ''}",
+        "convert_seconds": round(convert_seconds, 4),
+        "serialize_seconds": round(serialize_seconds, 4),
+        "peak_mb": round(max(convert_peak, serialize_peak) / 2 ** 20, 2),
+        "output_mb": round(size / 2 ** 20, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Include the largest synthetic rigs")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save and fail on regressions")
+    args = parser.parse_args()
+
+    cases = CASES + (FULL_CASES if args.full else [])
+    results = []
+
+    print(f"{'case':<32}{'convert s':>12}{'serialize s':>14}{'peak MB':>10}{'output MB':>12}")
+    for bones, frames in cases:
+        for rotation_mode in ROTATION_MODES:
+            for reduce_keyframes in (False, True):
+                result = run_case(bones, frames, rotation_mode, reduce_keyframes)
+                results.append(result)
+                print(f"{result['case']:<32}{result['convert_seconds']:>12.4f}{result['serialize_seconds']:>14.4f}"
+                      f"{result['peak_mb']:>10.2f}{result['output_mb']:>12.2f}")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {result["case"]: result for result in json.load(file)}
+
+        regressions = []
+        for result in results:
+            previous = baseline.get(result["case"])
+            if previous is None:
+                continue
+            for key in ("convert_seconds", "serialize_seconds", "peak_mb"):
+                # Ignore noise on cases that are too quick to time reliably
+                if result[key] > previous[key] * REGRESSION_THRESHOLD and result[key] - previous[key] > 0.01:
+                    regressions.append(f"{result['case']}: {key} {previous[key]} -> {result[key]}")
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
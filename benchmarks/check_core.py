@@ -0,0 +1,192 @@
+import io
+import itertools
+import json
+import math
+import os
+import random
+import struct
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Checks the bpy-independent conversion against the original per-frame export code, run with:
+#   python benchmarks/check_core.py
+# Exits with an error on the first mismatch.
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import minecraft_animatic_core as core
+
+def float32(value):
+    # Blender stores transforms as 32 bit floats
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+def random_value(rng, scale):
+    # Mostly arbitrary values, with some that land exactly on rounding ties
+    choice = rng.random()
+    if choice < 0.2:
+        return float32(rng.choice([0.0, -0.0, 0.25, -0.25, 0.5, 1.5, -2.5]) * scale / 4)
+    if choice < 0.4:
+        return float32(round(rng.uniform(-1, 1), 2))
+    return float32(rng.uniform(-scale, scale))
+
+def random_rotation(rng):
+    # Some angles whose degrees land exactly on a tie when rounded to one decimal place
+    if rng.random() < 0.3:
+        degrees = rng.choice([-1, 1]) * (rng.randrange(360) + rng.choice([0.25, 0.75]))
+        angle = degrees / (180.0 / math.pi)
+        for _ in range(8):
+            if angle * (180.0 / math.pi) == degrees:
+                return angle
+            angle = math.nextafter(angle, math.inf if angle * (180.0 / math.pi) < degrees else -math.inf)
+    return random_value(rng, 7)
+
+def baseline_pose_bone(rotation, location, scale, invert_rotation_axes, invert_position_axes):
+    # The original export's per-frame pose bone conversion
+    rotation_data = [
+        float(Decimal(math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)) if axis not in invert_rotation_axes
+        else float(Decimal(-math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
+        for axis, angle in enumerate(rotation)
+    ]
+    rotation_data = [-angle for angle in rotation_data]
+    if invert_rotation_axes[2]:
+        rotation_data[2] = -rotation_data[2]
+    rotation_data = [angle * core.ROTATION_MULTIPLIER for angle in rotation_data]
+
+    position = [coord * core.POSITION_MULTIPLIER for coord in location]
+    position[2] = -position[2]
+    for axis in range(3):
+        if invert_position_axes[axis]:
+            position[axis] = -position[axis]
+
+    return rotation_data, position, [coord * core.SCALE_MULTIPLIER for coord in scale]
+
+def baseline_object(rotation, location, scale, euler_mode, invert_rotation_axes):
+    # The original export's per-frame object conversion
+    if euler_mode:
+        rotation_data = [round(math.degrees(angle), 5) for angle in rotation]
+        rotation_data[0] = -rotation_data[0]
+    else:
+        rotation_data = [
+            float(Decimal(math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)) if axis not in invert_rotation_axes
+            else float(Decimal(-math.degrees(angle)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
+            for axis, angle in enumerate(rotation)
+        ]
+
+    if any(invert_rotation_axes):
+        rotation_data = [(-angle if invert_rotation_axes[axis] else angle) for axis, angle in enumerate(rotation_data)]
+    rotation_data = [angle * core.ROTATION_MULTIPLIER for angle in rotation_data]
+    rotation_data[0] = -rotation_data[0]
+    rotation_data[2] = -rotation_data[2]
+    rotation_data = [rotation_data[0], rotation_data[2], rotation_data[1]]
+
+    location = [round(coord, 5) for coord in location]
+    position = [coord * core.OBJ_POSITION_MULTIPLIER for coord in [location[0], location[2], location[1]]]
+
+    scale = [round(value, 5) for value in scale]
+    return rotation_data, position, [coord * core.SCALE_MULTIPLIER for coord in [scale[0], scale[2], scale[1]]]
+
+def check_rounding(rng):
+    # Ties and near ties at every precision the exporter rounds to
+    values = [rng.uniform(-1000, 1000) for _ in range(20000)]
+    values += [k / 20 for k in range(-4000, 4000)] + [k / 2e5 for k in range(-4000, 4000)]
+    values += [float32(value) for value in values[:5000]]
+
+    for places in (1, 5):
+        half_up = core.round_half_up(values, places)
+        half_even = core.round_half_even(values, places)
+        quantum = Decimal(1).scaleb(-places)
+        for value, up, even in zip(values, half_up, half_even):
+            assert up == float(Decimal(value).quantize(quantum, rounding=ROUND_HALF_UP)), (value, places, up)
+            assert even == round(value, places), (value, places, even)
+
+def check_convert_bone(rng):
+    # Every combination of inverted axes, for pose bones and for objects in both rotation modes
+    for invert_rotation_axes in itertools.product([False, True], repeat=3):
+        for invert_position_axes in itertools.product([False, True], repeat=3):
+            invert_rotation_axes, invert_position_axes = list(invert_rotation_axes), list(invert_position_axes)
+            fps = rng.choice([24, 25, 30, 60])
+            frames = sorted(rng.sample(range(5000), 40))
+
+            samples = core.new_samples()
+            samples["frames"] = frames
+            samples["euler_mode"] = [rng.random() < 0.5 for _ in frames]
+            samples["rotation"] = [tuple(random_rotation(rng) for _ in range(3)) for _ in frames]
+            samples["location"] = [tuple(random_value(rng, 50) for _ in range(3)) for _ in frames]
+            samples["scale"] = [tuple(random_value(rng, 3) for _ in range(3)) for _ in frames]
+
+            for is_pose_bone in (True, False):
+                expected = {"rotation": {}, "position": {}, "scale": {}}
+                for index, frame in enumerate(frames):
+                    rotation, location, scale = samples["rotation"][index], samples["location"][index], samples["scale"][index]
+                    if is_pose_bone:
+                        values = baseline_pose_bone(rotation, location, scale, invert_rotation_axes, invert_position_axes)
+                    else:
+                        values = baseline_object(rotation, location, scale, samples["euler_mode"][index], invert_rotation_axes)
+                    for channel, value in zip(expected, values):
+                        expected[channel][round(frame / fps, 5)] = value
+
+                converted = core.convert_bone([(is_pose_bone, samples)], fps, invert_rotation_axes, invert_position_axes)
+                assert repr(converted) == repr(expected), (is_pose_bone, invert_rotation_axes, invert_position_axes)
+
+def check_writer(rng):
+    # The streamed file parses as JSON and holds every value at the requested precision
+    bones = []
+    for bone in range(5):
+        bone_data = {
+            channel: {round(frame / 24, 5): [rng.choice([-0.0, 0.0, rng.uniform(-100, 100)]) for _ in range(3)] for frame in range(10)}
+            for channel in ("rotation", "position", "scale")
+        }
+        bone_data["scale"] = [1.0, "math.sin(360 * query.anim_time)", -0.0]
+        bones.append((f"bone_{bone}", bone_data))
+
+    for pretty in (True, False):
+        for precision in range(7):
+            precisions = {"rotation": precision, "position": precision, "scale": precision}
+            file = io.StringIO()
+            header = core.animation_header("Loop", 0, 9, 24, False, "", "", "", "")
+            core.write_animation_file(file, "1.8.0", [("animation.check", header, iter(bones))], pretty, precisions)
+            written = json.loads(file.getvalue())["animations"]["animation.check"]
+
+            assert written["loop"] is True and written["animation_length"] == 0.375
+            for name, bone_data in bones:
+                for channel, keys in bone_data.items():
+                    if isinstance(keys, list):
+                        assert written["bones"][name][channel] == keys
+                        continue
+                    for time, values in keys.items():
+                        written_values = written["bones"][name][channel][str(time)]
+                        assert np.allclose(written_values, values, rtol=0, atol=0.5 * 10 ** -precision + 1e-9), (values, written_values)
+
+def check_bake_key_frames(rng):
+    # Baked keys interpolate every frame within tolerance, and a bone that doesn't move keeps only its ends
+    tolerances = core.DEFAULT_KEYFRAME_TOLERANCES
+    limits = [math.radians(tolerances["rotation"])] * 3 + [tolerances["position"] / core.POSITION_MULTIPLIER] * 3 + [tolerances["scale"]] * 3
+    frames = list(range(10, 110))
+
+    key_frames, _ = core.bake_key_frames(frames, [[0.5, 0.0, 0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 1.0]] * len(frames), tolerances)
+    assert key_frames == [10, 109], key_frames
+
+    for _ in range(20):
+        speed = rng.uniform(0.01, 0.3)
+        values = np.array([[math.sin(frame * speed + axis) * rng.choice([0.01, 1.0]) for axis in range(9)] for frame in frames])
+        values[rng.randrange(len(frames))] += rng.uniform(-1, 1)
+        key_frames, key_values = core.bake_key_frames(frames, values, tolerances)
+        for column in range(9):
+            interpolated = np.interp(frames, key_frames, key_values[:, column])
+            assert np.abs(interpolated - values[:, column]).max() <= limits[column] + 1e-12, (speed, column)
+
+    # A bone spinning past 180 degrees keeps turning the same way instead of jumping back
+    angles = np.arange(len(frames)) * 0.1
+    values = [[math.remainder(angle, 2 * math.pi), 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0] for angle in angles]
+    key_frames, key_values = core.bake_key_frames(frames, values, tolerances)
+    assert key_frames == [10, 109] and abs(key_values[-1, 0] - angles[-1]) < 1e-9, key_frames
+
+def main():
+    rng = random.Random(0)
+    for check in (check_rounding, check_convert_bone, check_writer, check_bake_key_frames):
+        check(rng)
+        print(f"{check.__name__}: ok")
+
+if __name__ == "__main__":
+    main()
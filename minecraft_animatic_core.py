@@ -0,0 +1,765 @@
+import contextlib
+import json
+import math
+import os
+import re
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Conversion from sampled Blender channels to Minecraft Bedrock animations.
+# Nothing in here depends on bpy, so it can be benchmarked and checked outside Blender.
+
+# Define the position and scale multipliers
+OBJ_POSITION_MULTIPLIER = 15.5
+POSITION_MULTIPLIER = 16.0
+SCALE_MULTIPLIER = 1.0
+ROTATION_MULTIPLIER = 1.0
+
+# Channel values a bone rests at when the channel is left out
+IDENTITY_VALUES = {"rotation": 0.0, "position": 0.0, "scale": 1.0}
+
+# Default largest error allowed per channel when dropping or skipping keys
+DEFAULT_KEYFRAME_TOLERANCES = {"rotation": 0.1, "position": 0.01, "scale": 0.001}
+
+# Default decimals each channel's values are written with
+DEFAULT_PRECISIONS = {"rotation": 5, "position": 5, "scale": 5}
+
+# Most sines and highest polynomial degree tried when fitting looping channels to Molang expressions,
+# and the decimals their numbers are written with
+MAX_EXPRESSION_HARMONICS = 3
+MAX_EXPRESSION_DEGREE = 3
+EXPRESSION_PRECISION = 4
+
+# Map loop options
+LOOP_MAPPING = {"Play Once": False, "Loop": True, "Hold On Last Frame": "hold_on_last_frame"}
+
+def round_half_up(values, places):
+    # Matches Decimal.quantize(..., rounding=ROUND_HALF_UP) on the exact value of each float
+    values = np.asarray(values, dtype=np.float64)
+    scaled = np.abs(values) * 10.0 ** places
+    result = np.copysign(np.floor(scaled + 0.5) / 10.0 ** places, values)
+
+    # The scaled product can land on the wrong side of a tie, so settle those values exactly
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    quantum = Decimal(1).scaleb(-places)
+    for index in zip(*np.nonzero(near_tie)):
+        result[index] = float(Decimal(float(values[index])).quantize(quantum, rounding=ROUND_HALF_UP))
+
+    return result
+
+def round_half_even(values, places):
+    # Matches the built-in round(value, places) on the exact value of each float
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 10.0 ** places
+    result = np.rint(scaled) / 10.0 ** places
+
+    # The scaled product can land on the wrong side of a tie, so settle those values exactly
+    near_tie = np.abs(np.abs(scaled) - np.floor(np.abs(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    for index in zip(*np.nonzero(near_tie)):
+        result[index] = round(float(values[index]), places)
+
+    return result
+
+def frame_times(frames, fps):
+    # Convert keyframe numbers to seconds
+    return round_half_even(np.asarray(frames, dtype=np.float64) / fps, 5)
+
+def channel_keys(times, values):
+    # Pair each keyframe time in seconds with its channel value
+    return dict(zip(times.tolist(), values.tolist()))
+
+def reduce_keys(times, values, tolerance):
+    # Keep only the keys linear interpolation needs to stay within tolerance of every sample
+    keep = np.zeros(len(times), dtype=bool)
+    keep[[0, -1]] = True
+
+    def fits(first, last):
+        if last - first < 2:
+            return True
+        factor = (times[first + 1:last] - times[first]) / (times[last] - times[first])
+        interpolated = values[first] + factor[:, None] * (values[last] - values[first])
+        return np.abs(values[first + 1:last] - interpolated).max() <= tolerance
+
+    # Samples that their direct neighbours can't interpolate are kept up front in one pass,
+    # so only the gaps between them are searched below
+    if len(times) > 2:
+        factor = (times[1:-1] - times[:-2]) / (times[2:] - times[:-2])
+        interpolated = values[:-2] + factor[:, None] * (values[2:] - values[:-2])
+        keep[1:-1] = np.abs(values[1:-1] - interpolated).max(axis=1) > tolerance
+
+    kept = np.flatnonzero(keep)
+    for first, last in zip(kept[:-1], kept[1:]):
+        anchor = first
+        while last - anchor >= 2:
+            # Find the furthest sample the anchor can reach, doubling the step then bisecting
+            step = 2
+            while anchor + step < last and fits(anchor, anchor + step):
+                step *= 2
+
+            if anchor + step >= last and fits(anchor, last):
+                break
+
+            reach, miss = step // 2, min(step, last - anchor)
+            while miss - reach > 1:
+                middle = (reach + miss) // 2
+                if fits(anchor, anchor + middle):
+                    reach = middle
+                else:
+                    miss = middle
+
+            anchor += reach
+            keep[anchor] = True
+
+    return keep
+
+def reduce_channels(times, channels, tolerances):
+    reduced = {}
+
+    for channel, values in channels.items():
+        tolerance = tolerances[channel]
+
+        # Omit channels that stay at their identity value for the whole clip
+        if np.all(np.abs(values - IDENTITY_VALUES[channel]) <= tolerance):
+            continue
+
+        # Collapse constant channels to a single key
+        if np.all(np.abs(values - values[0]) <= tolerance):
+            reduced[channel] = (times[:1], values[:1])
+            continue
+
+        keep = reduce_keys(times, values, tolerance)
+        reduced[channel] = (times[keep], values[keep])
+
+    return reduced
+
+def molang_sum(terms):
+    # Join (coefficient, factor) terms into "a + b * x - c * y", leaving out zero terms and factors of one
+    text = ""
+    for coefficient, factor in terms:
+        if coefficient == 0:
+            continue
+
+        number = format_number(abs(coefficient), EXPRESSION_PRECISION)
+        if factor is None:
+            term = number
+        else:
+            term = factor if number == "1" else f"{number} * {factor}"
+
+        if text:
+            text += (" - " if coefficient < 0 else " + ") + term
+        else:
+            text = ("-" if coefficient < 0 else "") + term
+
+    return text or "0"
+
+def sine_expression(times, values, period, harmonics):
+    # Least squares fit of an offset plus a sine per harmonic of the loop, as Molang and its values at times.
+    # Molang's math.sin takes degrees, so each term is written as amplitude * math.sin(anim_time * speed + phase).
+    angles = 2 * np.pi * times[:, None] * np.arange(1, harmonics + 1) / period
+    basis = np.concatenate([np.ones((len(times), 1)), np.cos(angles), np.sin(angles)], axis=1)
+    coefficients = np.linalg.lstsq(basis, values, rcond=None)[0]
+
+    offset = round(float(coefficients[0]), EXPRESSION_PRECISION)
+    terms = [(offset, None)]
+    fitted = np.full(len(times), offset)
+
+    for harmonic in range(1, harmonics + 1):
+        cosine, sine = coefficients[harmonic], coefficients[harmonics + harmonic]
+        amplitude = round(float(np.hypot(cosine, sine)), EXPRESSION_PRECISION)
+        speed = round(360.0 * harmonic / period, EXPRESSION_PRECISION)
+        phase = round(float(np.degrees(np.arctan2(cosine, sine))), EXPRESSION_PRECISION)
+
+        angle = molang_sum([(speed, "query.anim_time"), (phase, None)])
+        terms.append((amplitude, f"math.sin({angle})"))
+        fitted += amplitude * np.sin(np.radians(times * speed + phase))
+
+    return molang_sum(terms), fitted
+
+def polynomial_expression(times, values, period, degree):
+    # Least squares fit of a polynomial of anim_time, written in Horner form, as Molang and its values at times.
+    # The fit runs on time divided by the loop length to stay well conditioned.
+    coefficients = np.polynomial.polynomial.polyfit(times / period, values, degree)
+    coefficients = [round(float(coefficient / period ** power), EXPRESSION_PRECISION) for power, coefficient in enumerate(coefficients)]
+
+    expression = format_number(coefficients[-1], EXPRESSION_PRECISION)
+    fitted = np.full(len(times), coefficients[-1])
+    for coefficient in reversed(coefficients[:-1]):
+        factor = f"query.anim_time * ({expression})" if " " in expression or expression.startswith("-") else f"query.anim_time * {expression}"
+        expression = molang_sum([(coefficient, None), (1, factor)])
+        fitted = coefficient + times * fitted
+
+    return expression, fitted
+
+def fit_axis_expression(times, values, period, tolerance):
+    # The number or shortest Molang expression of query.anim_time within tolerance of every sample, or None
+    # Tracks with fewer than two samples are left as keys
+    if len(times) < 2:
+        return None
+
+    if np.ptp(values) <= tolerance:
+        return round(float(values.mean()), EXPRESSION_PRECISION)
+
+    # Fewest coefficients first, and never more than half the samples so the fit can't just pass through every key
+    candidates = sorted(
+        [(degree + 1, polynomial_expression, degree) for degree in range(1, MAX_EXPRESSION_DEGREE + 1)] +
+        [(2 * harmonics + 1, sine_expression, harmonics) for harmonics in range(1, MAX_EXPRESSION_HARMONICS + 1)],
+        key=lambda candidate: candidate[0]
+    )
+    for size, fit, order in candidates:
+        if size * 2 > len(times):
+            break
+
+        expression, fitted = fit(times, values, period, order)
+        if np.abs(fitted - values).max() <= tolerance:
+            return expression
+
+    return None
+
+def fit_channel_expression(times, values, period, tolerance):
+    # A looping channel as one [x, y, z] of numbers and Molang expressions, or None when an axis doesn't fit
+    # or none of them need an expression, leaving the channel to be written as keys
+    axes = [fit_axis_expression(times, values[:, axis], period, tolerance) for axis in range(3)]
+    if any(axis is None for axis in axes) or not any(isinstance(axis, str) for axis in axes):
+        return None
+    return axes
+
+def bake_key_frames(frames, values, keyframe_tolerances):
+    # The frames one baked bone needs keyed and their values, from its (euler, location, scale) rows at every frame.
+    # Starting from the first and last frame, frames are only kept where linear interpolation strays past the tolerances.
+    times = np.asarray(frames, dtype=np.float64)
+    values = np.array(values, dtype=np.float64).reshape(-1, 9)
+
+    # Eulers read from each frame's matrix wrap at 180 degrees, unwrap them so keys turn the short way between frames
+    values[:, 0:3] = np.unwrap(values[:, 0:3], axis=0)
+
+    # Tolerances in Blender units
+    keep = reduce_keys(times, values[:, 0:3], math.radians(keyframe_tolerances["rotation"]))
+    keep |= reduce_keys(times, values[:, 3:6], keyframe_tolerances["position"] / POSITION_MULTIPLIER)
+    keep |= reduce_keys(times, values[:, 6:9], keyframe_tolerances["scale"])
+    return [frame for frame, kept in zip(frames, keep) if kept], values[keep]
+
+def new_samples():
+    return {"frames": [], "euler_mode": [], "rotation": [], "location": [], "scale": []}
+
+def convert_pose_bone_samples(samples, invert_rotation_axes, invert_position_axes):
+    rotation_euler = np.array(samples["rotation"], dtype=np.float64).reshape(-1, 3)
+    location = np.array(samples["location"], dtype=np.float64).reshape(-1, 3)
+    scale = np.array(samples["scale"], dtype=np.float64).reshape(-1, 3)
+
+    # Convert to degrees and invert specific axes if needed, rounding to one decimal place
+    degrees = rotation_euler * (180.0 / math.pi)
+    keep_sign = np.array([axis not in invert_rotation_axes for axis in range(3)])
+    rotation_data = round_half_up(np.where(keep_sign, degrees, -degrees), 1)
+
+    # Invert X Y & Z and Rotation data
+    rotation_data = -rotation_data
+
+    # If invert options are true in export menu
+    if invert_rotation_axes[2]:
+        rotation_data[:, 2] = -rotation_data[:, 2]
+
+    # Multiply rotation values by the rotation multiplier
+    rotation_data = rotation_data * ROTATION_MULTIPLIER
+
+    # Multiply position values by the multiplier
+    transformed_position = location * POSITION_MULTIPLIER
+
+    # Invert Y and Z components of position_data
+    transformed_position[:, 2] = -transformed_position[:, 2]
+
+    # If invert options are true in export menu
+    for axis in range(3):
+        if invert_position_axes[axis]:
+            transformed_position[:, axis] = -transformed_position[:, axis]
+
+    # Multiply scale values by the scale multiplier
+    transformed_scale = scale * SCALE_MULTIPLIER
+
+    return {
+        "rotation": rotation_data,
+        "position": transformed_position,
+        "scale": transformed_scale,
+    }
+
+def convert_object_samples(samples, invert_rotation_axes):
+    rotation_euler = np.array(samples["rotation"], dtype=np.float64).reshape(-1, 3)
+    location = np.array(samples["location"], dtype=np.float64).reshape(-1, 3)
+    scale = np.array(samples["scale"], dtype=np.float64).reshape(-1, 3)
+    euler_mode = np.array(samples["euler_mode"], dtype=bool).reshape(-1, 1)
+
+    degrees = rotation_euler * (180.0 / math.pi)
+
+    # Use raw Euler angles without conversions in XYZ mode
+    euler_rotation = round_half_even(degrees, 5)
+    euler_rotation[:, 0] = -euler_rotation[:, 0]
+
+    # Otherwise convert to degrees and invert specific axes if needed, rounding to one decimal place
+    keep_sign = np.array([axis not in invert_rotation_axes for axis in range(3)])
+    quaternion_rotation = round_half_up(np.where(keep_sign, degrees, -degrees), 1)
+
+    rotation_data = np.where(euler_mode, euler_rotation, quaternion_rotation)
+
+    # Check if the rotation data is non-zero before inverting
+    if any(invert_rotation_axes):
+        rotation_data = np.where(np.array(invert_rotation_axes, dtype=bool), -rotation_data, rotation_data)
+
+    # Multiply rotation values by the rotation multiplier
+    rotation_data = rotation_data * ROTATION_MULTIPLIER
+
+    # Invert Rotation X & Z
+    rotation_data[:, 0] = -rotation_data[:, 0]
+    rotation_data[:, 2] = -rotation_data[:, 2]
+
+    # Swap Y and Z values for rotation
+    rotation_data = rotation_data[:, [0, 2, 1]]
+
+    # Swap Y and Z values for position and multiply by the multiplier
+    transformed_position = round_half_even(location, 5)[:, [0, 2, 1]] * OBJ_POSITION_MULTIPLIER
+
+    # Swap Y and Z values for scale and multiply by the scale multiplier
+    transformed_scale = round_half_even(scale, 5)[:, [0, 2, 1]] * SCALE_MULTIPLIER
+
+    return {
+        "rotation": rotation_data,
+        "position": transformed_position,
+        "scale": transformed_scale,
+    }
+
+def animation_header(loop, frame_start, frame_end, fps, override, anim_time_update, blend_weight, start_delay, loop_delay):
+    # Convert animation length from frames to seconds
+    anim_length_seconds = (frame_end - frame_start) / fps
+
+    return {
+        "loop": LOOP_MAPPING[loop],
+        "animation_length": round(anim_length_seconds, 5),
+        "override_previous_animation": override,
+        **{key: value for key, value in {
+            "anim_time_update": anim_time_update if anim_time_update != "0.0" else None,
+            "blend_weight": blend_weight if blend_weight != "0.0" else None,
+            "start_delay": start_delay if start_delay != "0.0" else None,
+            "loop_delay": loop_delay if loop_delay != "0.0" else None
+        }.items() if value}
+    }
+
+def convert_bone(tracks, fps, invert_rotation_axes, invert_position_axes, reduce_keyframes=False, keyframe_tolerances=None, expression_period=None, frame_offset=0):
+    # Convert the (is_pose_bone, samples) tracks written under one bone name to its channel data.
+    # With an expression_period, channels repeating over it can be written as Molang expressions instead of keys.
+    # Key times are counted from frame_offset, so clips that start later still begin at 0 seconds.
+    bone_data = {}
+    keyframe_tolerances = keyframe_tolerances or DEFAULT_KEYFRAME_TOLERANCES
+
+    for is_pose_bone, samples in tracks:
+        # Convert each track's samples to Minecraft channels in one batch
+        times = frame_times(np.asarray(samples["frames"], dtype=np.float64) - frame_offset, fps)
+        if is_pose_bone:
+            channels = convert_pose_bone_samples(samples, invert_rotation_axes, invert_position_axes)
+        else:
+            channels = convert_object_samples(samples, invert_rotation_axes)
+
+        # Fit looping channels to expressions, the ones that don't fit within tolerance stay as keys
+        expressions = {}
+        if expression_period:
+            for channel, values in channels.items():
+                expression = fit_channel_expression(times, values, expression_period, keyframe_tolerances[channel])
+                if expression is not None:
+                    expressions[channel] = expression
+        order = list(channels)
+        channels = {channel: values for channel, values in channels.items() if channel not in expressions}
+
+        # Drop keys that linear interpolation reproduces within tolerance
+        if reduce_keyframes:
+            channels = reduce_channels(times, channels, keyframe_tolerances)
+        else:
+            channels = {channel: (times, values) for channel, values in channels.items()}
+
+        track_data = {
+            channel: expressions[channel] if channel in expressions else channel_keys(*channels[channel])
+            for channel in order if channel in expressions or channel in channels
+        }
+
+        # Bones merge channels from every armature, objects replace them
+        if is_pose_bone:
+            bone_data.update(track_data)
+        else:
+            bone_data = track_data
+
+    # Bones left with no channels after reduction rest at identity and are not written
+    if reduce_keyframes and not bone_data:
+        return None
+
+    return bone_data
+
+def parse_channel(channel):
+    # Read a Bedrock channel into sorted key times and XYZ values, along with how many keys weren't plain numbers.
+    # Channels are a single vector or keyed by time, with vectors, single numbers or {"pre", "post"} objects as values
+    if not isinstance(channel, dict):
+        channel = {"0.0": channel}
+
+    times, values, skipped = [], [], 0
+    for key_time, value in channel.items():
+        if isinstance(value, dict):
+            value = value.get("post", value.get("pre"))
+        if not isinstance(value, list):
+            value = [value] * 3
+
+        # Molang expressions can't be turned into keyframes
+        try:
+            vector = [float(component) for component in value]
+            key_time = float(key_time)
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+
+        if len(vector) != 3:
+            skipped += 1
+            continue
+
+        times.append(key_time)
+        values.append(vector)
+
+    times = np.array(times, dtype=np.float64)
+    values = np.array(values, dtype=np.float64).reshape(-1, 3)
+    order = np.argsort(times, kind='stable')
+    return times[order], values[order], skipped
+
+def revert_pose_bone_channels(channels, invert_rotation_axes, invert_position_axes):
+    # Undo convert_pose_bone_samples, giving Blender euler angles in radians, location and scale
+    reverted = {}
+
+    if "rotation" in channels:
+        # Same sign test as the export, then undo the inversion of all axes and the extra Z inversion
+        keep_sign = np.array([axis not in invert_rotation_axes for axis in range(3)])
+        degrees = -np.where(keep_sign, 1.0, -1.0) * channels["rotation"] / ROTATION_MULTIPLIER
+        if invert_rotation_axes[2]:
+            degrees[:, 2] = -degrees[:, 2]
+        reverted["rotation"] = np.radians(degrees)
+
+    if "position" in channels:
+        position = channels["position"] / POSITION_MULTIPLIER
+        position = np.where(np.array(invert_position_axes, dtype=bool), -position, position)
+        position[:, 2] = -position[:, 2]
+        reverted["position"] = position
+
+    if "scale" in channels:
+        reverted["scale"] = channels["scale"] / SCALE_MULTIPLIER
+
+    return reverted
+
+def revert_object_channels(channels, invert_rotation_axes, euler_mode=True):
+    # Undo convert_object_samples, giving Blender euler angles in radians, location and scale
+    reverted = {}
+
+    if "rotation" in channels:
+        # Swap Y and Z back and undo the X and Z inversions
+        rotation = channels["rotation"][:, [0, 2, 1]] / ROTATION_MULTIPLIER
+        rotation[:, 0] = -rotation[:, 0]
+        rotation[:, 2] = -rotation[:, 2]
+
+        # XYZ objects also had X inverted up front, other rotation modes had the export's sign test applied
+        if euler_mode:
+            rotation[:, 0] = -rotation[:, 0]
+        else:
+            keep_sign = np.array([axis not in invert_rotation_axes for axis in range(3)])
+            rotation = np.where(keep_sign, rotation, -rotation)
+
+        # Then undo the export menu inversions
+        rotation = np.where(np.array(invert_rotation_axes, dtype=bool), -rotation, rotation)
+
+        reverted["rotation"] = np.radians(rotation)
+
+    if "position" in channels:
+        reverted["position"] = channels["position"][:, [0, 2, 1]] / OBJ_POSITION_MULTIPLIER
+
+    if "scale" in channels:
+        reverted["scale"] = channels["scale"][:, [0, 2, 1]] / SCALE_MULTIPLIER
+
+    return reverted
+
+def euler_to_quaternion(eulers):
+    # (w, x, y, z) quaternions of XYZ euler angles, flipped where needed so neighbouring keys interpolate the short way
+    cx, cy, cz = np.cos(eulers / 2).T
+    sx, sy, sz = np.sin(eulers / 2).T
+    quaternions = np.stack([
+        cx * cy * cz + sx * sy * sz,
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+    ], axis=1)
+
+    flips = np.ones(len(quaternions))
+    flips[1:] = np.where((quaternions[1:] * quaternions[:-1]).sum(axis=1) < 0, -1.0, 1.0)
+    return quaternions * np.cumprod(flips)[:, None]
+
+# Bump whenever the conversion changes so bone caches written by older versions are not reused
+BONE_CACHE_VERSION = 2
+
+def bone_cache_options(fps, invert_rotation_axes, invert_position_axes, reduce_keyframes, keyframe_tolerances, expression_period=None, frame_offset=0):
+    # Everything besides the F-curves that a converted bone depends on
+    return repr((
+        BONE_CACHE_VERSION, OBJ_POSITION_MULTIPLIER, POSITION_MULTIPLIER, SCALE_MULTIPLIER, ROTATION_MULTIPLIER,
+        fps, list(invert_rotation_axes), list(invert_position_axes), bool(reduce_keyframes),
+        sorted(keyframe_tolerances.items()) if reduce_keyframes or expression_period else None,
+        expression_period, frame_offset,
+    ))
+
+def load_bone_cache(cache_path):
+    # Map each cache key to converted bone data, starting over when the cache is missing or outdated
+    try:
+        with open(cache_path) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != BONE_CACHE_VERSION:
+        return {}
+
+    # Keyed channels are lists of [time, values] pairs, expression channels a single [x, y, z]
+    return {
+        key: None if bone_data is None else {
+            channel: dict(keys) if all(isinstance(key, list) for key in keys) else keys
+            for channel, keys in bone_data.items()
+        }
+        for key, bone_data in cache["bones"].items()
+    }
+
+def save_bone_cache(cache_path, bone_cache):
+    # Keys are stored as [time, values] pairs so times come back as the same floats
+    with open_atomic(cache_path) as file:
+        json.dump({
+            "version": BONE_CACHE_VERSION,
+            "bones": {
+                key: None if bone_data is None else {
+                    channel: keys if isinstance(keys, list) else list(keys.items())
+                    for channel, keys in bone_data.items()
+                }
+                for key, bone_data in bone_cache.items()
+            },
+        }, file, separators=(",", ":"))
+
+# Trailing zeros and negative zero in numbers written with a fixed precision
+TRAILING_ZEROS = re.compile(r'\.?0+(?=[,\]])')
+NEGATIVE_ZERO = re.compile(r'(?<=[\[ ,])-0(?=[,\]])')
+
+def format_number(value, precision):
+    # Write numbers from fixed precision, dropping trailing zeros and negative zero
+    text = f"{value:.{precision}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+@contextlib.contextmanager
+def open_atomic(filepath):
+    # Write next to the output and only move it into place once the whole file is written
+    temp_filepath = filepath + ".tmp"
+    try:
+        with open(temp_filepath, 'w') as file:
+            yield file
+        os.replace(temp_filepath, filepath)
+    finally:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+
+class AnimationWriter:
+    # Streams an animation file member by member instead of dumping one large dict
+
+    def __init__(self, file, pretty=True, precisions=None):
+        self.file = file
+        self.pretty = pretty
+        self.precisions = {**DEFAULT_PRECISIONS, **(precisions or {})}
+        self.separator = ": " if pretty else ":"
+        self.first = []
+
+    def newline(self):
+        if self.pretty:
+            self.file.write("\n" + "    " * len(self.first))
+
+    def member(self, key=None):
+        # Nothing precedes the root object
+        if not self.first:
+            return
+
+        if not self.first[-1]:
+            self.file.write(",")
+        self.first[-1] = False
+        self.newline()
+
+        if key is not None:
+            self.file.write(json.dumps(key) + self.separator)
+
+    def begin_object(self, key=None):
+        self.member(key)
+        self.file.write("{")
+        self.first.append(True)
+
+    def end_object(self):
+        if not self.first.pop():
+            self.newline()
+        self.file.write("}")
+
+    def write_value(self, key, value):
+        self.member(key)
+        self.file.write(json.dumps(value))
+
+    def write_bone(self, name, bone_data):
+        self.begin_object(name)
+
+        for channel, keys in bone_data.items():
+            precision = self.precisions[channel]
+            vector_separator = ", " if self.pretty else ","
+
+            # Channels fitted to expressions are a single vector of numbers and Molang strings
+            if isinstance(keys, list):
+                self.member(channel)
+                self.file.write("[" + vector_separator.join(
+                    json.dumps(value) if isinstance(value, str) else format_number(value, precision) for value in keys
+                ) + "]")
+                continue
+
+            self.begin_object(channel)
+            if keys:
+                # Format the whole channel at once, then strip zeros from every number in one pass
+                indent = "\n" + "    " * len(self.first) if self.pretty else ""
+                vector = "[" + vector_separator.join([f"%.{precision}f"] * 3) + "]"
+                text = ("," + indent).join(
+                    f'"{key_time}"{self.separator}' + (vector % tuple(values) if len(values) == 3 else
+                    "[" + vector_separator.join(format_number(value, precision) for value in values) + "]")
+                    for key_time, values in keys.items()
+                )
+                if precision > 0:
+                    text = TRAILING_ZEROS.sub("", text)
+                text = NEGATIVE_ZERO.sub("0", text)
+
+                self.file.write(indent + text)
+                self.first[-1] = False
+            self.end_object()
+
+        self.end_object()
+
+class PhaseProfile:
+    # Times the phases of an export or import and counts what each bone produced.
+    # Phases can nest, a phase's time excludes the phases started inside it.
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.phases = {}
+        self.bones = {}
+        self.stack = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self.stack:
+            self.pause(now)
+        self.stack.append([name, now])
+
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.pause(now)
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] = now
+
+    def pause(self, now):
+        name, started = self.stack[-1]
+        self.phases[name] = self.phases.get(name, 0.0) + now - started
+
+    def bone(self, anim_id, name):
+        return self.bones.setdefault((anim_id, name), {"frames_sampled": 0, "keys_written": 0, "bytes_written": 0})
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+
+    def summary(self):
+        # A few lines for the operator's info panel
+        bones = self.bones.values()
+        lines = [
+            f"Took {self.seconds:.3f}s: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()),
+        ]
+        if self.bones:
+            lines.append(
+                f"{len(self.bones)} bones, {sum(bone['frames_sampled'] for bone in bones)} frames sampled, "
+                f"{sum(bone['keys_written'] for bone in bones)} keys, {sum(bone['bytes_written'] for bone in bones) / 2 ** 20:.2f} MB written"
+            )
+
+            # The bones that cost the most are the ones worth looking at first
+            largest = sorted(self.bones.items(), key=lambda item: item[1]["bytes_written"], reverse=True)[:3]
+            lines.append("Largest bones: " + ", ".join(f"{name} ({bone['keys_written']} keys)" for (anim_id, name), bone in largest))
+        return lines
+
+    def write_trace(self, trace_path):
+        with open_atomic(trace_path) as file:
+            json.dump({
+                "seconds": self.seconds,
+                "phases": self.phases,
+                "bones": [{"animation": anim_id, "bone": name, **bone} for (anim_id, name), bone in self.bones.items()],
+            }, file, indent=4)
+
+def profile_phase(profile, name):
+    return profile.phase(name) if profile is not None else contextlib.nullcontext()
+
+class ProfiledFile:
+    # Times the writes to a file and counts the UTF-8 bytes written
+
+    def __init__(self, file, profile):
+        self.file = file
+        self.profile = profile
+        self.written = 0
+
+    def write(self, text):
+        with self.profile.phase("write"):
+            self.file.write(text)
+        self.written += len(text.encode())
+
+def write_animation_file(file, format_version, animations, pretty=True, precisions=None, profile=None):
+    # Write (anim_id, header, bones) animations as a Bedrock animation file, each (name, bone_data) as soon as the bones iterator produces it
+    for _ in animation_file_steps(file, format_version, animations, pretty, precisions, profile):
+        pass
+
+def animation_file_steps(file, format_version, animations, pretty=True, precisions=None, profile=None):
+    # write_animation_file one bone at a time, yielding after each so the caller can spread an export over time.
+    # A bones iterator can also produce None to hand control back while it is still working towards its next bone.
+    if profile is not None:
+        file = ProfiledFile(file, profile)
+
+    writer = AnimationWriter(file, pretty, precisions)
+    writer.begin_object()
+    writer.write_value("format_version", format_version)
+    writer.begin_object("animations")
+
+    for anim_id, header, bones in animations:
+        writer.begin_object(anim_id)
+        for key, value in header.items():
+            writer.write_value(key, value)
+
+        writer.begin_object("bones")
+        for bone in bones:
+            if bone is None:
+                yield
+                continue
+
+            name, bone_data = bone
+            if profile is None:
+                writer.write_bone(name, bone_data)
+                yield
+                continue
+
+            written = file.written
+            with profile.phase("serialize"):
+                writer.write_bone(name, bone_data)
+
+            counts = profile.bone(anim_id, name)
+            # Expression channels are a single [x, y, z] and hold no keys
+            counts["keys_written"] += sum(len(keys) for keys in bone_data.values() if isinstance(keys, dict))
+            counts["bytes_written"] += file.written - written
+            yield
+        writer.end_object()
+
+        writer.end_object()
+
+    writer.end_object()
+    writer.end_object()
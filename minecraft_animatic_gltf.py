@@ -0,0 +1,242 @@
+import argparse
+import base64
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Converts the animations of a .gltf/.glb file straight to a Minecraft Bedrock animation file,
+# giving the same result as importing it and exporting its empties, without Blender.
+# Run from the command line with:
+#   python minecraft_animatic_gltf.py model.glb [-o model.animation.json]
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.append(SCRIPT_DIR)
+
+from minecraft_animatic_core import new_samples, animation_header, convert_bone, open_atomic, write_animation_file
+
+GLB_MAGIC = b"glTF"
+GLB_JSON_CHUNK = 0x4E4F534A
+GLB_BIN_CHUNK = 0x004E4942
+
+COMPONENT_TYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, 5126: np.float32}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+# Rest values of nodes without a transform
+IDENTITY_TRS = {"translation": [0.0, 0.0, 0.0], "rotation": [0.0, 0.0, 0.0, 1.0], "scale": [1.0, 1.0, 1.0]}
+
+def read_gltf(filepath):
+    # Return the glTF JSON and its buffers as memoryviews over the file contents
+    with open(filepath, 'rb') as file:
+        data = file.read()
+
+    view = memoryview(data)
+    glb_buffer = None
+
+    if data[:4] == GLB_MAGIC:
+        # Header, then a JSON chunk and an optional binary chunk
+        offset = 12
+        gltf = None
+        while offset < len(data):
+            length, chunk_type = struct.unpack_from("<II", data, offset)
+            chunk = view[offset + 8:offset + 8 + length]
+            if chunk_type == GLB_JSON_CHUNK:
+                gltf = json.loads(bytes(chunk))
+            elif chunk_type == GLB_BIN_CHUNK and glb_buffer is None:
+                glb_buffer = chunk
+            offset += 8 + length
+    else:
+        gltf = json.loads(data)
+
+    buffers = []
+    for buffer in gltf.get("buffers", []):
+        uri = buffer.get("uri")
+        if uri is None:
+            buffers.append(glb_buffer)
+        elif uri.startswith("data:"):
+            buffers.append(memoryview(base64.b64decode(uri.split(",", 1)[1])))
+        else:
+            with open(os.path.join(os.path.dirname(filepath), uri), 'rb') as file:
+                buffers.append(memoryview(file.read()))
+
+    return gltf, buffers
+
+def read_accessor(gltf, buffers, index):
+    # View an accessor's elements in place, only copying when integers have to be normalized
+    accessor = gltf["accessors"][index]
+    if "sparse" in accessor:
+        raise ValueError(f"Sparse accessor {index} is not supported")
+
+    dtype = np.dtype(COMPONENT_TYPES[accessor["componentType"]])
+    size = TYPE_SIZES[accessor["type"]]
+    count = accessor["count"]
+
+    buffer_view = gltf["bufferViews"][accessor["bufferView"]]
+    buffer = buffers[buffer_view["buffer"]]
+    offset = buffer_view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    stride = buffer_view.get("byteStride") or dtype.itemsize * size
+
+    values = np.ndarray((count, size), dtype=dtype, buffer=buffer, offset=offset, strides=(stride, dtype.itemsize))
+
+    if accessor.get("normalized") and dtype.kind in "iu":
+        values = values / np.iinfo(dtype).max
+        if dtype.kind == "i":
+            values = np.maximum(values, -1.0)
+
+    return values
+
+def node_rest_transform(node):
+    # A node's local translation, rotation and scale when it isn't animated
+    if "matrix" in node:
+        matrix = np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+        scale = np.linalg.norm(matrix[:3, :3], axis=0)
+        rotation = quaternion_from_matrix(matrix[:3, :3] / scale)
+        return {"translation": matrix[:3, 3], "rotation": rotation, "scale": scale}
+
+    return {path: np.array(node.get(path, value), dtype=np.float64) for path, value in IDENTITY_TRS.items()}
+
+def quaternion_from_matrix(matrix):
+    # (x, y, z, w) quaternion of a rotation matrix
+    trace = np.trace(matrix)
+    if trace > 0:
+        s = 2.0 * np.sqrt(trace + 1.0)
+        return np.array([(matrix[2, 1] - matrix[1, 2]) / s, (matrix[0, 2] - matrix[2, 0]) / s, (matrix[1, 0] - matrix[0, 1]) / s, s / 4])
+
+    axis = int(np.argmax(np.diag(matrix)))
+    i, j, k = axis, (axis + 1) % 3, (axis + 2) % 3
+    s = 2.0 * np.sqrt(1.0 + matrix[i, i] - matrix[j, j] - matrix[k, k])
+    quaternion = np.empty(4)
+    quaternion[i] = s / 4
+    quaternion[j] = (matrix[j, i] + matrix[i, j]) / s
+    quaternion[k] = (matrix[k, i] + matrix[i, k]) / s
+    quaternion[3] = (matrix[k, j] - matrix[j, k]) / s
+    return quaternion
+
+def quaternion_to_euler(quaternions):
+    # XYZ euler angles of (w, x, y, z) quaternions, picking the same of the two solutions as Blender
+    quaternions = quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+    q0, q1, q2, q3 = (quaternions * np.sqrt(2.0)).T
+
+    m00 = 1.0 - q2 * q2 - q3 * q3
+    m01 = q0 * q3 + q1 * q2
+    m02 = -q0 * q2 + q1 * q3
+    m11 = 1.0 - q1 * q1 - q3 * q3
+    m12 = q0 * q1 + q2 * q3
+    m21 = -q0 * q1 + q2 * q3
+    m22 = 1.0 - q1 * q1 - q2 * q2
+
+    cy = np.hypot(m00, m01)
+    gimbal = cy <= 16 * np.finfo(np.float32).eps
+
+    euler1 = np.stack([
+        np.where(gimbal, np.arctan2(-m21, m11), np.arctan2(m12, m22)),
+        np.arctan2(-m02, cy),
+        np.where(gimbal, 0.0, np.arctan2(m01, m00)),
+    ], axis=1)
+    euler2 = np.where(gimbal[:, None], euler1, np.stack([
+        np.arctan2(-m12, -m22),
+        np.arctan2(-m02, -cy),
+        np.arctan2(-m01, -m00),
+    ], axis=1))
+
+    use_second = np.abs(euler1).sum(axis=1) > np.abs(euler2).sum(axis=1)
+    return np.where(use_second[:, None], euler2, euler1)
+
+def sampler_keys(gltf, buffers, sampler):
+    # Key times in seconds, the value at each key and how to interpolate between them
+    times = read_accessor(gltf, buffers, sampler["input"])[:, 0].astype(np.float64)
+    values = read_accessor(gltf, buffers, sampler["output"]).astype(np.float64)
+
+    # Cubic spline outputs hold an in-tangent, value and out-tangent per key
+    if sampler.get("interpolation") == "CUBICSPLINE":
+        values = values[1::3]
+
+    return times, values, sampler.get("interpolation", "LINEAR")
+
+def node_samples(gltf, buffers, node, channels):
+    # Sample every animated path of a node on the union of its key times, like the exporter does per object
+    rest = node_rest_transform(node)
+    times = np.unique(np.concatenate([keys[0] for keys in channels.values()]))
+
+    paths = {}
+    for path, rest_value in rest.items():
+        if path in channels:
+            key_times, key_values, interpolation = channels[path]
+            if interpolation == "STEP":
+                paths[path] = key_values[np.clip(np.searchsorted(key_times, times, side='right') - 1, 0, len(key_times) - 1)]
+            else:
+                paths[path] = np.stack([np.interp(times, key_times, key_values[:, axis]) for axis in range(key_values.shape[1])], axis=1)
+        else:
+            paths[path] = np.tile(rest_value, (len(times), 1))
+
+    # Same axes as Blender's glTF importer, which turns Y up into Z up
+    translation, rotation, scale = paths["translation"], paths["rotation"], paths["scale"]
+    samples = new_samples()
+    samples["frames"] = times
+    samples["euler_mode"] = np.zeros(len(times), dtype=bool)
+    samples["rotation"] = quaternion_to_euler(np.stack([rotation[:, 3], rotation[:, 0], -rotation[:, 2], rotation[:, 1]], axis=1))
+    samples["location"] = np.stack([translation[:, 0], -translation[:, 2], translation[:, 1]], axis=1)
+    samples["scale"] = scale[:, [0, 2, 1]]
+    return samples
+
+def gltf_animations(gltf, buffers, anim_id_template, model_name, loop, invert_rotation_axes):
+    # Yield (anim_id, header, bones) for every animation in the file
+    nodes = gltf.get("nodes", [])
+
+    for animation_index, animation in enumerate(gltf.get("animations", [])):
+        # Group the animation's channels per node, keeping the order nodes first appear in
+        node_channels = {}
+        for channel in animation["channels"]:
+            target = channel["target"]
+            if "node" not in target or target["path"] not in IDENTITY_TRS:
+                continue
+            sampler = animation["samplers"][channel["sampler"]]
+            node_channels.setdefault(target["node"], {})[target["path"]] = sampler_keys(gltf, buffers, sampler)
+
+        bones = []
+        anim_length = 0.0
+        for node_index, channels in node_channels.items():
+            node = nodes[node_index]
+            samples = node_samples(gltf, buffers, node, channels)
+            anim_length = max(anim_length, float(samples["frames"][-1]))
+
+            # Key times are already in seconds, so convert with one frame per second
+            bone_data = convert_bone([(False, samples)], 1, invert_rotation_axes, [False, False, False])
+            bones.append((node.get("name", f"Node_{node_index}"), bone_data))
+
+        animation_name = animation.get("name", f"animation_{animation_index}")
+        anim_id = anim_id_template.replace("{rig}", model_name).replace("{action}", animation_name)
+        yield anim_id, animation_header(loop, 0, anim_length, 1, False, "", "", "", ""), iter(bones)
+
+def convert_gltf_animation(filepath, output_path, format_version="1.8.0", anim_id_template="animation.{rig}.{action}", loop="Play Once", invert_rotation_axes=(False, False, False), pretty=True, precisions=None):
+    gltf, buffers = read_gltf(filepath)
+    model_name = os.path.splitext(os.path.basename(filepath))[0]
+
+    if not gltf.get("animations"):
+        raise ValueError(f"{filepath} has no animations")
+
+    animations = gltf_animations(gltf, buffers, anim_id_template, model_name, loop, list(invert_rotation_axes))
+    with open_atomic(output_path) as file:
+        write_animation_file(file, format_version, animations, pretty, precisions)
+
+    return len(gltf["animations"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the animations of a .gltf/.glb file to a Minecraft animation file")
+    parser.add_argument("input", help=".gltf or .glb file")
+    parser.add_argument("-o", "--output", help="Output file, defaults to the input with a .animation.json extension")
+    parser.add_argument("--format-version", default="1.8.0")
+    parser.add_argument("--anim-id-template", default="animation.{rig}.{action}", help="{rig} is replaced with the file name and {action} with the animation name")
+    parser.add_argument("--loop", default="Play Once", choices=["Play Once", "Loop", "Hold On Last Frame"])
+    parser.add_argument("--minified", action="store_true", help="Write the file without indentation")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + ".animation.json"
+    count = convert_gltf_animation(args.input, output, args.format_version, args.anim_id_template, args.loop, pretty=not args.minified)
+    print(f"Converted {count} animations to {output}")
+
+if __name__ == "__main__":
+    main()